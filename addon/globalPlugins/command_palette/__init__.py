@@ -11,10 +11,17 @@
   Crafted by Musharraf Omer <info@blindpandas.com>.
 """
 
+import wx
 import globalPluginHandler
 from contextlib import suppress
 from scriptHandler import script
 from .command_palette import CommandPaletteDialog
+from .command_store import CommandStore
+from . import instrumentation
+
+
+# Milliseconds to wait after the add-on is loaded before loading the commands
+STORE_PREWARM_DELAY = 5000
 
 
 # import addonHandler
@@ -24,10 +31,26 @@ from .command_palette import CommandPaletteDialog
 class GlobalPlugin(globalPluginHandler.GlobalPlugin):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.command_palette_dialog = CommandPaletteDialog()
+        instrumentation.install()
+        self.command_store = CommandStore()
+        self.command_palette_dialog = None
+        # Load the commands in the background once NVDA has settled
+        self._prewarm_timer = wx.CallLater(
+            STORE_PREWARM_DELAY, self.command_store.prewarm
+        )
 
     def terminate(self):
         """Terminates the add-on."""
+        with suppress(Exception):
+            self._prewarm_timer.Stop()
+        with suppress(Exception):
+            self.command_store.terminate()
+        if instrumentation.timings.enabled:
+            instrumentation.timings.log_report()
+        if self.command_palette_dialog is None:
+            return
+        with suppress(Exception):
+            self.command_palette_dialog.search_worker.terminate()
         with suppress(Exception):
             self.command_palette_dialog.Destroy()
 
@@ -37,4 +60,6 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         gesture="kb:nvda+shift+p",
     )
     def script_launch_command_palette(self, gesture):
+        if self.command_palette_dialog is None:
+            self.command_palette_dialog = CommandPaletteDialog(self.command_store)
         self.command_palette_dialog.popup_command_palette()
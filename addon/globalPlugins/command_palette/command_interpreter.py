@@ -1,6 +1,7 @@
 # coding: utf-8
 
 import importlib
+import json
 import os
 import webbrowser
 import baseObject
@@ -11,11 +12,11 @@ import keyboardHandler
 import scriptHandler
 import globalCommands
 import vision
+import ui
 from abc import ABC, abstractmethod
 from contextlib import contextmanager
 from functools import partial
 from copy import deepcopy
-from dataclasses import dataclass
 from urllib import parse
 from logHandler import log
 
@@ -55,7 +56,6 @@ class ChangeCommand(Exception):
         self.new_command = new_command
 
 
-@dataclass
 class CommandInterpreter(ABC):
     __slots__ = [
         "label",
@@ -87,6 +87,18 @@ class CommandInterpreter(ABC):
         command_cls = cls.registered_categories[category]
         return command_cls(command_info, args, label)
 
+    @classmethod
+    def get_identity(cls, label, command_info):
+        """Return the (category, label, command_info) identifying a command across sessions."""
+        if isinstance(command_info, (list, dict)):
+            # JSON arrays and objects are not hashable
+            command_info = json.dumps(command_info, sort_keys=True)
+        return (cls.category, label, command_info)
+
+    @property
+    def identity(self):
+        return self.get_identity(self.label, self.command_info)
+
     @property
     def requires_text_arg(self):
         return self.__requires_text_arg__ or self.args.get("requires_text_arg")
@@ -183,6 +195,15 @@ class SpecialCommand(CommandInterpreter):
             new_command=ShellExecuteCommandInterpreter(USER_COMMANDS_JSON),
         )
 
+    def run_log_search_timings(self):
+        from .instrumentation import timings
+
+        if not timings.enabled:
+            ui.message(_("Search timings are not enabled"))
+            return
+        timings.log_report()
+        ui.message(_("Search timings written to the log"))
+
     def run_open_scratchpad_directory(self):
         scratchpad_directory = config.getScratchpadDir()
         raise ChangeCommand(
@@ -194,6 +215,14 @@ class SpecialCommand(CommandInterpreter):
 class NVDAGestureCommand(CommandInterpreter):
     category = "nvda"
 
+    @classmethod
+    def get_identity(cls, label, command_info):
+        return (
+            cls.category,
+            label,
+            f"{command_info.moduleName}.{command_info.className}.{command_info.scriptName}",
+        )
+
     def run(self):
         script_func = self.findScript(
             module=self.command_info.moduleName,
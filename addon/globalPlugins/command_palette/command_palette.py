@@ -9,7 +9,7 @@ import ui
 from contextlib import contextmanager
 from gui import guiHelper
 from logHandler import log
-from .command_store import CommandStore
+from .search_worker import SearchWorker
 from . import command_interpreter
 from .immutable_listview import ImmutableObjectListView, ColumnDefn
 
@@ -24,6 +24,12 @@ LISTVIEW_COLUMNS = (
 )
 
 
+class LoadingEntry:
+    """Stands in the command list while the commands are loaded."""
+
+    label = _("Loading commands...")
+
+
 def runScriptModalDialog(dialog, callback=None):
     """Run a modal dialog from a script.
     This will not block the caller,
@@ -47,9 +53,11 @@ def runScriptModalDialog(dialog, callback=None):
 
 
 class CommandPaletteDialog(wx.Dialog):
-    def __init__(self):
+    def __init__(self, store):
         super().__init__(parent=None, title=_("Command Palette"), size=(-1, 500))
-        self.store = CommandStore()
+        self.store = store
+        self.search_session = self.store.create_search_session()
+        self.search_worker = SearchWorker(self.search_session, self.onSearchResults)
         self.entryLabelText = _("Enter Command")
         mainSizer = wx.BoxSizer(wx.VERTICAL)
         sHelper = guiHelper.BoxSizerHelper(self, wx.VERTICAL)
@@ -59,7 +67,11 @@ class CommandPaletteDialog(wx.Dialog):
         )
         listLabel = wx.StaticText(self, -1, _("Commands"))
         self.commandList = ImmutableObjectListView(
-            self, columns=LISTVIEW_COLUMNS, id=wx.ID_ANY, size=(400, 500)
+            self,
+            columns=LISTVIEW_COLUMNS,
+            virtual=True,
+            id=wx.ID_ANY,
+            size=(400, 500),
         )
         guiHelper.associateElements(listLabel, self.commandList)
         entrySizer = wx.BoxSizer(wx.VERTICAL)
@@ -93,14 +105,35 @@ class CommandPaletteDialog(wx.Dialog):
         self.commandList.Bind(wx.EVT_CHAR, self.onCommandListChar, self.commandList)
         # Assign  variables
         self._last_selected_item = -2
+        self._loading = False
         self.__arg_entry_mode_active = False
         self.__current_command = None
 
     def popup_command_palette(self):
         if not self.IsShown():
+            if self.store.is_ready:
+                self.store.load_gesture_commands()
+            else:
+                # Show the palette now, and the commands once they are loaded
+                self._loading = True
+                self.store.prewarm(
+                    on_loaded=lambda: wx.CallAfter(self.onCommandsLoaded)
+                )
             runScriptModalDialog(self)
             self.commandList.SetFocus()
 
+    def onCommandsLoaded(self):
+        self._loading = False
+        if not self.IsShown():
+            return
+        self.store.load_gesture_commands()
+        self.search_worker.cancel()
+        text = self.commandEntry.GetLineText(0)
+        if text.strip():
+            self.search_worker.search(text)
+        else:
+            self.populate_command_list(self.store.get_default_commands())
+
     def enable_arg_entry_mode(self, entry_label_text):
         self.__arg_entry_mode_active = True
         self.entryLabel.SetLabelText(entry_label_text)
@@ -120,11 +153,16 @@ class CommandPaletteDialog(wx.Dialog):
 
     def onShow(self, event):
         if event.IsShown():
-            self.populate_command_list(self.store.get_commands())
+            self.search_worker.cancel()
+            if self._loading:
+                self.populate_command_list((LoadingEntry(),))
+            else:
+                self.populate_command_list(self.store.get_default_commands())
         else:
             self.onHide()
 
     def onHide(self):
+        self.search_worker.cancel()
         wx.CallAfter(self.disable_arg_entry_mode)
         wx.CallAfter(self.commandEntry.Clear)
         wx.CallAfter(self.commandList.set_objects, ())
@@ -140,15 +178,18 @@ class CommandPaletteDialog(wx.Dialog):
         if self.__arg_entry_mode_active:
             event.Skip()
             return
-        current_text = self.commandEntry.GetLineText(0)
-        if not current_text.strip():
-            suggestions = self.store.get_commands()
-        else:
-            suggestions = self.store.filter_by(current_text)
+        if self._loading:
+            # Searched once the commands are loaded
+            return
+        self.search_worker.search(self.commandEntry.GetLineText(0))
+
+    def onSearchResults(self, text, suggestions):
+        if self.__arg_entry_mode_active:
+            return
         self.populate_command_list(suggestions)
         if self.IsShown() and not suggestions:
             queueHandler.queueFunction(
-                queueHandler.eventQueue, ui.message, _("No commands")
+                queueHandler.eventQueue, self.announce, _("No commands")
             )
 
     def onCommandEntryTextEnter(self, event):
@@ -156,7 +197,15 @@ class CommandPaletteDialog(wx.Dialog):
             if not self.commandEntry.IsEmpty() and wx.KeyboardState().ControlDown():
                 self.run_shell_command(self.commandEntry.GetValue())
                 return
-            elif self.commandList.IsEmpty():
+            if self.search_worker.is_pending():
+                # The results for the current text have not arrived yet
+                self.search_worker.cancel()
+                text = self.commandEntry.GetLineText(0)
+                if text.strip():
+                    self.populate_command_list(self.store.filter_by(text))
+                else:
+                    self.populate_command_list(self.store.get_default_commands())
+            if self.commandList.IsEmpty():
                 return wx.Bell()
             self.activate_command(self.commandList.get_object(0))
         else:
@@ -232,7 +281,12 @@ class CommandPaletteDialog(wx.Dialog):
     def populate_command_list(self, commands):
         self.commandList.set_objects(commands)
 
+    def announce(self, message):
+        ui.message(message)
+
     def activate_command(self, command):
+        if self._loading:
+            return wx.Bell()
         if command.requires_text_arg:
             self.__current_command = command
             self.enable_arg_entry_mode(command.text_entry_label)
@@ -241,6 +295,7 @@ class CommandPaletteDialog(wx.Dialog):
 
     def run_command(self, command):
         wx.CallAfter(self.Hide)
+        self.store.record_usage(command)
         command_interpreter.run_command(command)
 
     def run_shell_command(self, command_string, user_error=True):
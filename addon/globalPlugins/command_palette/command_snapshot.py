@@ -0,0 +1,141 @@
+# coding: utf-8
+
+"""Snapshots of the commands parsed from the JSON files.
+
+A snapshot holds the columns of the CommandTable of the commands,
+along with the prepared search data: the processed labels and
+their tokens, and the postings of the n-gram index. The JSON files do
+not have to be parsed nor the labels processed again. It records the
+modification time, size and SHA-1 digest of the files it was built
+from. It is valid as long as the files have the same modification time
+and size, or the same size and digest, and the labels are processed the
+same way.
+"""
+
+import codecs
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+from contextlib import suppress
+from functools import partial
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "libs")))
+from fuzzywuzzy.utils import PROCESSOR_VERSION
+
+sys.path.pop(0)
+
+
+# Bump when the content of the snapshots changes
+SNAPSHOT_FORMAT = 5
+SNAPSHOT_HEADER = (
+    "command_palette",
+    SNAPSHOT_FORMAT,
+    PROCESSOR_VERSION,
+    marshal.version,
+)
+# Bytes read at once from the source files
+CHUNK_SIZE = 1 << 16
+
+
+class SourceReader:
+    """Reads a source file as chunks of text.
+
+    Once all the chunks are read, `description` is the (path, mtime,
+    size, digest) of the file. A missing file has no chunks and is
+    described as (path, None, None, None).
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.description = (path, None, None, None)
+
+    def __iter__(self):
+        try:
+            stat = os.stat(self.path)
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        digest = hashlib.sha1()
+        decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        with file:
+            for chunk in iter(partial(file.read, self.chunk_size), b""):
+                digest.update(chunk)
+                yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+        self.description = (
+            self.path,
+            stat.st_mtime_ns,
+            stat.st_size,
+            digest.hexdigest(),
+        )
+
+    def describe(self):
+        """Read the file and return its description."""
+        for chunk in self:
+            pass
+        return self.description
+
+
+def stat_source(path):
+    """Return the (mtime, size) of a source file, (None, None) if it is missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return (None, None)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def is_unchanged(source):
+    path, mtime, size, digest = source
+    stat = stat_source(path)
+    if digest is None or stat[0] is None:
+        return digest is None and stat[0] is None
+    if stat[1] != size:
+        return False
+    if stat[0] == mtime:
+        return True
+    with open(path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest() == digest
+
+
+def load_snapshot(path, source_paths):
+    """Return the dictionary saved in the snapshot at path.
+
+    Returns None if there is no snapshot, or if it was not built from
+    the current content of the files at source_paths.
+    """
+    try:
+        with open(path, "rb") as file:
+            header, sources, content = marshal.loads(file.read())
+        if header != SNAPSHOT_HEADER:
+            return None
+        if [source[0] for source in sources] != list(source_paths):
+            return None
+        if not all(is_unchanged(source) for source in sources):
+            return None
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return content
+
+
+def save_snapshot(path, sources, content):
+    """Save a snapshot of the content, a dictionary of built-in types.
+
+    The sources are the descriptions of the files given by SourceReader.
+    The file at path is replaced only once the snapshot is written.
+    """
+    data = marshal.dumps((SNAPSHOT_HEADER, sources, content))
+    fd, temp_path = tempfile.mkstemp(
+        prefix=".command_palette_snapshot", dir=os.path.dirname(path)
+    )
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except:
+        with suppress(OSError):
+            os.remove(temp_path)
+        raise
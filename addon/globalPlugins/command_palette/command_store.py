@@ -2,18 +2,27 @@
 
 import sys
 import os
-import operator
+import itertools
+import threading
 import config
+import globalVars
 import inputCore
+import globalPluginHandler
 import gui
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
+from functools import partial
 from logHandler import log
 from .command_interpreter import CommandInterpreter, NVDAGestureCommand
+from .command_table import CommandRows, CommandTable
+from . import instrumentation
+from .command_snapshot import SourceReader, load_snapshot, save_snapshot, stat_source
+from .json_records import JSONRecordReader
+from .ngram_index import NgramIndex
+from .usage_store import UsageStore
 
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "libs")))
-import ujson
-from fuzzywuzzy import process
+from fuzzywuzzy import process, utils
 
 sys.path.pop(0)
 
@@ -24,54 +33,674 @@ BUILTIN_COMMANDS_FILE = os.path.abspath(
 USER_COMMANDS_JSON = os.path.normpath(
     os.path.join(os.path.expanduser("~"), "command_palette.json")
 )
+USAGE_JSON = os.path.join(
+    os.path.dirname(USER_COMMANDS_JSON), "command_palette_usage.json"
+)
+# The commands parsed from the JSON files, set to "" to always parse them
+SNAPSHOT_FILE = os.path.join(
+    globalVars.appArgs.configPath, "command_palette_snapshot.bin"
+)
+# How the labels and the queries are normalized before they are compared:
+# "unicode" removes the accents and folds the case of the letters, "ascii"
+# lowercases them and drops the Latin-1 characters, such as "é"
+MATCHING_MODE = "unicode"
+# The processor of the labels and the queries of every matching mode
+PROCESSORS = {
+    "unicode": utils.fold_process,
+    "ascii": partial(utils.full_process, force_ascii=True),
+}
+# Commands scoring less than this are not shown
+SCORE_CUTOFF = 50
+# Commands scoring at least this are kept as candidates for the next keystroke
+RETAIN_SCORE_CUTOFF = 40
+# Queries shorter than this are too unselective to narrow the next search
+MIN_REFINE_QUERY_LENGTH = 3
+MAX_RESULTS = 1000
+# Number of commands scored between checks for cancellation
+SEARCH_CHUNK_SIZE = 256
+# Only score the commands sharing character bigrams with the query
+USE_NGRAM_INDEX = True
+NGRAM_SIZE = 2
+INDEX_MAX_CANDIDATES = 1000
+# Shorter queries scan all the commands
+MIN_INDEXED_QUERY_LENGTH = 3
+# Number of focus contexts whose gesture commands are kept
+GESTURE_CACHE_SIZE = 16
+# Seconds after which the frecency of a command is halved
+FRECENCY_HALF_LIFE = 14 * 24 * 3600
+# Points added to the score of the most used commands, and the frecency
+# giving half of them
+FRECENCY_MAX_BOOST = 15
+FRECENCY_HALF_BOOST = 2
+MAX_USAGE_ENTRIES = 500
+# Seconds after the last command run before the usage is saved
+USAGE_SAVE_DELAY = 2
+# Number of queries whose results are kept
+QUERY_CACHE_SIZE = 256
+# Invalid commands listed in the log when loading a commands file
+MAX_REPORTED_ERRORS = 20
+# Offered with the gesture commands when the search timings are recorded
+LOG_TIMINGS_COMMAND = ("special", "Log Search Timings", "log_search_timings")
+
+
+def parse_command_item(record):
+    """Return the (category, label, command_info, args) of a command defined in JSON.
+
+    Raises ValueError if the record does not define a valid command.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("A command must be a JSON object")
+    category = record.get("category")
+    if category not in CommandInterpreter.registered_categories:
+        raise ValueError(f"Unknown category: {category!r}")
+    label = record.get("label")
+    if not isinstance(label, str) or not label.strip():
+        raise ValueError("Missing label")
+    if "command_info" not in record:
+        raise ValueError(f"Missing command_info for '{label}'")
+    args = record.get("args", {})
+    if not isinstance(args, dict):
+        raise ValueError(f"The args of '{label}' must be a JSON object")
+    return (category, label, record["command_info"], args)
+
+
+class SearchCancelled(Exception):
+    """Raised when a search is superseded before it completes."""
+
+
+class QueryCache:
+    """A bounded LRU cache of search results, counting hits and misses."""
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def get_gesture_context(obj):
+    """Return a key identifying the gestures available when obj has the focus.
+
+    Returns None if the context of obj can not be determined.
+    """
+    if obj is None:
+        return None
+    try:
+        tree_interceptor = obj.treeInterceptor
+        return (
+            type(obj.appModule),
+            type(tree_interceptor) if tree_interceptor else None,
+            type(obj),
+        )
+    except Exception:
+        return None
+
+
+def get_gesture_maps_signature():
+    """Return a value that changes when gesture maps or global plugins change."""
+    manager = inputCore.manager
+    user_map = manager.userGestureMap
+    return (
+        id(manager.localeGestureMap),
+        id(user_map),
+        frozenset(
+            (gesture, tuple(scripts)) for (gesture, scripts) in user_map._map.items()
+        ),
+        tuple(id(plugin) for plugin in globalPluginHandler.runningPlugins),
+    )
 
 
 class CommandStore:
-    """Retrieves and parses commands stored as strings."""
+    """Retrieves and parses commands stored as strings.
+
+    Nothing is loaded when the store is created. The commands defined in
+    the JSON files are loaded by `load`, which can be called ahead of
+    time from a background thread using `prewarm`, and `is_ready` tells
+    whether they are loaded, so that the GUI thread does not wait for
+    them. The NVDA gestures
+    depend on the focus, so they are loaded on the GUI thread by
+    `load_gesture_commands` every time the palette pops up. It also
+    reloads the user commands when their file changed, preparing only
+    the labels of the commands that changed.
+
+    The commands are kept in a CommandTable, and searched by row. The
+    commands returned are CommandRows, which create the interpreter of
+    a command only when it is displayed or run.
+
+    The labels are prepared once by the processor of MATCHING_MODE, which
+    also prepares the queries. Snapshots prepared in another mode are
+    not used.
+
+    The gesture commands, merged with the commands from the JSON files,
+    are cached by focus context (see get_gesture_context). The cache is
+    cleared when the gesture maps or the running plugins change.
+
+    The best matches of full searches are cached by query and version of
+    the command set, every command set built getting a new version.
+
+    The commands that are run are recorded in a UsageStore. The best
+    matches are reordered by adding a boost, growing with the frecency
+    of the command, to their score. Without a query, the most used
+    commands come first.
+    """
+
+    _versions = itertools.count(1)
 
     def __init__(self):
-        with open(BUILTIN_COMMANDS_FILE, "r") as file:
-            data = ujson.load(file)
-        if os.path.isfile(USER_COMMANDS_JSON):
-            with open(USER_COMMANDS_JSON, "r") as file:
-                try:
-                    user_commands = ujson.load(file)
-                    data.extend(user_commands)
-                except:
-                    log.exception(
-                        f"Failed to load commands from user commands file: '{USER_COMMANDS_JSON}'"
+        self.processor = PROCESSORS[MATCHING_MODE]
+        self.commands = CommandTable()
+        self.search_choices = process.PreparedChoices((), processor=self.processor)
+        self.search_index = None
+        self.version = 0
+        self.command_set = (self.commands, self.search_choices, None, 0)
+        self.query_cache = QueryCache(QUERY_CACHE_SIZE)
+        self._load_lock = threading.Lock()
+        self._static_table = None
+        self._static_choices = None
+        self._static_index = None
+        self._builtin_count = 0
+        self._user_file_stat = None
+        self._gesture_cache = OrderedDict()
+        self._gesture_maps_signature = None
+        self.usage = UsageStore(
+            USAGE_JSON, half_life=FRECENCY_HALF_LIFE, max_entries=MAX_USAGE_ENTRIES
+        )
+
+    @property
+    def is_ready(self):
+        """Whether the commands of the JSON files are loaded."""
+        return self._static_table is not None
+
+    def prewarm(self, on_loaded=None):
+        """Load the commands from the JSON files on a background thread.
+
+        If given, on_loaded is called from that thread once loading is over.
+        """
+        threading.Thread(
+            target=self._prewarm,
+            args=(on_loaded,),
+            name="command_palette_prewarm",
+            daemon=True,
+        ).start()
+
+    def _prewarm(self, on_loaded):
+        try:
+            self.load()
+        except:
+            log.exception("Failed to load the command palette commands")
+        if on_loaded is not None:
+            on_loaded()
+
+    def load(self):
+        """Load the commands defined in the JSON files, if not loaded yet.
+
+        If another thread is loading them, wait until it is done.
+        """
+        with self._load_lock:
+            if self._static_table is not None:
+                return
+            self.usage.load()
+            source_paths = (BUILTIN_COMMANDS_FILE, USER_COMMANDS_JSON)
+            self._user_file_stat = stat_source(USER_COMMANDS_JSON)
+            snapshot = None
+            if SNAPSHOT_FILE:
+                snapshot = load_snapshot(SNAPSHOT_FILE, source_paths)
+            if snapshot is not None and snapshot["matching_mode"] != MATCHING_MODE:
+                snapshot = None
+            if snapshot is None:
+                table, builtin_count, sources = self._read_command_files(source_paths)
+                processed = process.PreparedChoices(
+                    table.labels, processor=self.processor
+                ).processed
+                postings = None
+            else:
+                table = CommandTable.from_content(snapshot["table"])
+                builtin_count = snapshot["builtin_count"]
+                processed = [
+                    utils.PreparedString.restore(label, sorted_tokens)
+                    for (label, sorted_tokens) in zip(
+                        snapshot["processed"], snapshot["sorted_tokens"]
                     )
-        nvda_commands = inputCore.manager.getAllGestureMappings(
-            obj=gui.mainFrame.prevFocus, ancestors=gui.mainFrame.prevFocusAncestors
+                ]
+                postings = snapshot["postings"]
+                if snapshot["ngram_size"] != NGRAM_SIZE:
+                    postings = None
+            self._builtin_count = builtin_count
+            command_set = self._set_static_commands(table, processed, postings=postings)
+            if snapshot is None and sources is not None:
+                self._save_snapshot(sources)
+            self._set_commands(command_set)
+
+    def _set_static_commands(self, table, processed, postings=None):
+        """Replace the commands defined in the JSON files.
+
+        processed are their prepared labels. Return their command set.
+        """
+        self._static_table = table
+        self._static_choices = self._prepared_choices(processed)
+        command_set = self._build_command_set(
+            table, self._static_choices, postings=postings
         )
-        self.commands = [
-            CommandInterpreter.create(
-                category=item["category"],
-                label=item["label"],
-                command_info=item["command_info"],
-                args=item.get("args", {}),
+        self._static_index = command_set[2]
+        return command_set
+
+    def _prepared_choices(self, processed, start=0):
+        """Return PreparedChoices of prepared labels, keyed by their row from start."""
+        choices = process.PreparedChoices((), processor=self.processor)
+        choices.keys = range(start, start + len(processed))
+        choices.processed = processed
+        return choices
+
+    def _refresh_user_commands(self):
+        """Reload the user commands if their file changed since it was read.
+
+        Commands that are still defined the same way are kept as they are,
+        only the new ones are created, prepared and indexed.
+        """
+        if stat_source(USER_COMMANDS_JSON) == self._user_file_stat:
+            return
+        with self._load_lock:
+            count = self._builtin_count
+            old_table = self._static_table
+            old_processed = self._static_choices.processed
+            previous = defaultdict(list)
+            for row in range(count, len(old_table)):
+                previous[repr(old_table.item(row))].append(row)
+            table = old_table.slice(0, count)
+            processed = old_processed[:count]
+            # The old rows of the commands that are kept, mapped to their new row
+            moved = {row: row for row in range(count)}
+            source = SourceReader(USER_COMMANDS_JSON)
+            errors = []
+            for item in self._iter_items(source, errors):
+                kept = previous.get(repr(item))
+                if kept:
+                    old_row = kept.pop(0)
+                    moved[old_row] = len(table)
+                    label = old_processed[old_row]
+                else:
+                    label = self._static_choices.prepare(item[1])
+                table.append(*item)
+                processed.append(label)
+            self._user_file_stat = source.description[1:3]
+            self._report_errors(USER_COMMANDS_JSON, errors)
+            postings = None
+            if self._static_index is not None:
+                postings = self._static_index.updated_postings(
+                    self._prepared_choices(processed), moved
+                )
+            self._set_static_commands(table, processed, postings=postings)
+            self._gesture_cache.clear()
+            if SNAPSHOT_FILE and not errors:
+                builtin_source = SourceReader(BUILTIN_COMMANDS_FILE).describe()
+                self._save_snapshot([builtin_source, source.description])
+
+    def _save_snapshot(self, sources):
+        if not SNAPSHOT_FILE:
+            return
+        processed = self._static_choices.processed
+        search_index = self._static_index
+        content = {
+            "table": self._static_table.to_content(),
+            "builtin_count": self._builtin_count,
+            "matching_mode": MATCHING_MODE,
+            "processed": [str(label) for label in processed],
+            "sorted_tokens": [label.sorted_tokens for label in processed],
+            "ngram_size": NGRAM_SIZE,
+            "postings": None if search_index is None else dict(search_index.postings),
+        }
+        try:
+            save_snapshot(SNAPSHOT_FILE, sources, content)
+        except:
+            log.exception(f"Failed to save the commands to: '{SNAPSHOT_FILE}'")
+
+    @classmethod
+    def _read_command_files(cls, source_paths):
+        """Read the commands defined in the JSON files.
+
+        Return a CommandTable of the commands, the number of built-in
+        commands, and the description of the files, which is None if some
+        commands were invalid.
+        """
+        table = CommandTable()
+        builtin_count = None
+        sources = []
+        for path in source_paths:
+            source = SourceReader(path)
+            errors = []
+            for item in cls._iter_items(source, errors):
+                table.append(*item)
+            if builtin_count is None:
+                builtin_count = len(table)
+            cls._report_errors(path, errors)
+            if errors:
+                sources = None
+            elif sources is not None:
+                sources.append(source.description)
+        return table, builtin_count, sources
+
+    @staticmethod
+    def _iter_items(source, errors):
+        """Yield the (category, label, command_info, args) of the commands
+        read from a JSON array or JSON lines source, one at a time.
+
+        The invalid commands are skipped, and their (line, message) are
+        appended to errors.
+        """
+        reader = JSONRecordReader(source)
+        for line, record in reader:
+            try:
+                yield parse_command_item(record)
+            except ValueError as e:
+                errors.append((line, str(e)))
+        errors.extend(reader.errors)
+        errors.sort()
+
+    @staticmethod
+    def _report_errors(path, errors):
+        if not errors:
+            return
+        details = "\n".join(
+            f"Line {line}: {message}"
+            for (line, message) in errors[:MAX_REPORTED_ERRORS]
+        )
+        if len(errors) > MAX_REPORTED_ERRORS:
+            details += f"\n{len(errors) - MAX_REPORTED_ERRORS} more"
+        log.warning(f"Skipped {len(errors)} invalid commands in '{path}':\n{details}")
+
+    def load_gesture_commands(self):
+        """Add the NVDA gestures available in the previously focused context.
+
+        This should be called from the GUI thread.
+        """
+        self.load()
+        self._refresh_user_commands()
+        signature = get_gesture_maps_signature()
+        if signature != self._gesture_maps_signature:
+            self._gesture_cache.clear()
+            self._gesture_maps_signature = signature
+        obj = gui.mainFrame.prevFocus
+        context = get_gesture_context(obj)
+        command_set = self._gesture_cache.get(context)
+        if command_set is None:
+            command_set = self._build_gesture_command_set(
+                obj, gui.mainFrame.prevFocusAncestors
             )
-            for idx, item in enumerate(data)
-        ]
-        self.commands.extend(
-            NVDAGestureCommand(command_info=info, label=f"{cat}: {label}")
-            for (cat, cmd_list) in sorted(nvda_commands.items())
-            for (label, info) in sorted(cmd_list.items())
+            if context is not None:
+                self._gesture_cache[context] = command_set
+                if len(self._gesture_cache) > GESTURE_CACHE_SIZE:
+                    self._gesture_cache.popitem(last=False)
+        else:
+            self._gesture_cache.move_to_end(context)
+        self._set_commands(command_set)
+
+    def _build_gesture_command_set(self, obj, ancestors):
+        nvda_commands = inputCore.manager.getAllGestureMappings(
+            obj=obj, ancestors=ancestors
+        )
+        gesture_table = CommandTable()
+        for cat, cmd_list in sorted(nvda_commands.items()):
+            for label, info in sorted(cmd_list.items()):
+                gesture_table.append(
+                    NVDAGestureCommand.category, f"{cat}: {label}", info
+                )
+        if instrumentation.timings.enabled:
+            gesture_table.append(*LOG_TIMINGS_COMMAND)
+        gesture_choices = self._prepared_choices(
+            process.PreparedChoices(
+                gesture_table.labels, processor=self.processor
+            ).processed,
+            start=len(self._static_table),
         )
-        self.search_choices = {cmd: cmd.label for cmd in self.get_commands()}
+        return self._build_command_set(
+            self._static_table + gesture_table,
+            self._static_choices + gesture_choices,
+            base_index=self._static_index,
+        )
+
+    @classmethod
+    def _build_command_set(
+        cls, commands, search_choices, base_index=None, postings=None
+    ):
+        """Return the (commands, search_choices, search_index, version) to search.
+
+        The n-gram index reuses base_index, an index of the first choices,
+        or is restored from postings saved from an index of the choices.
+        """
+        search_index = None
+        if USE_NGRAM_INDEX:
+            index_options = {
+                "n": NGRAM_SIZE,
+                "max_candidates": INDEX_MAX_CANDIDATES,
+                "min_query_length": MIN_INDEXED_QUERY_LENGTH,
+            }
+            if postings is not None:
+                search_index = NgramIndex.from_postings(
+                    search_choices, postings, **index_options
+                )
+            else:
+                search_index = NgramIndex(
+                    search_choices, base=base_index, **index_options
+                )
+        return (commands, search_choices, search_index, next(cls._versions))
+
+    def _set_commands(self, command_set):
+        self.command_set = command_set
+        (
+            self.commands,
+            self.search_choices,
+            self.search_index,
+            self.version,
+        ) = command_set
+
+    def terminate(self):
+        """Save the pending usage."""
+        try:
+            self.usage.flush()
+        except:
+            log.exception(f"Failed to save the command usage to: '{USAGE_JSON}'")
 
     def get_commands(self):
         return self.commands
 
+    def get_default_commands(self):
+        """Return the commands by decreasing frecency, unused ones in store order."""
+        commands = self.commands
+        frecencies = self.usage.frecencies()
+        if not frecencies:
+            return commands
+        used = commands.find_rows(frecencies)
+        rows = sorted(used, key=lambda row: frecencies[used[row]], reverse=True)
+        rows.extend(row for row in range(len(commands)) if row not in used)
+        return CommandRows(commands, rows)
+
+    def record_usage(self, command):
+        if command.label is None:
+            return
+        self.usage.record(command.identity)
+        self.usage.save_later(USAGE_SAVE_DELAY)
+
+    def get_search_choices(self, text, command_set=None):
+        """Return the prepared choices worth scoring for text."""
+        commands, search_choices, search_index, version = (
+            command_set or self.command_set
+        )
+        if search_index is not None:
+            candidates = search_index.candidates(text)
+            if candidates is not None:
+                return candidates
+        return search_choices
+
+    def get_cache_key(self, text, command_set=None):
+        commands, search_choices, search_index, version = (
+            command_set or self.command_set
+        )
+        return (version, search_choices.prepare(text))
+
     def filter_by(self, text):
-        results = sorted(
-            [
-                (j, k)
-                for i, j, k in process.extractBests(
-                    text, self.search_choices, limit=1000, score_cutoff=50
+        command_set = self.command_set
+        key = self.get_cache_key(text, command_set)
+        if not key[1]:
+            return []
+        best_matches = self.query_cache.get(key)
+        if best_matches is None:
+            choices = self.get_search_choices(text, command_set)
+            matches = process.extractBestIndices(
+                text, choices, score_cutoff=SCORE_CUTOFF, limit=MAX_RESULTS
+            )
+            best_matches = [(score, choices.keys[index]) for (index, score) in matches]
+            self.cache_best_matches(key, best_matches)
+        return self.promote(best_matches, command_set[0])
+
+    def score(self, text, choices, score_cutoff=SCORE_CUTOFF, cancelled=None):
+        """Return a list of (processed_label, score, row) for the matching commands.
+
+        If given, `cancelled` is called between chunks of commands, and
+        the search is abandoned with SearchCancelled when it returns True.
+        """
+        if not choices.prepare(text):
+            return []
+        if cancelled is None:
+            return list(
+                process.extractWithoutOrder(text, choices, score_cutoff=score_cutoff)
+            )
+        matches = []
+        for start in range(0, len(choices), SEARCH_CHUNK_SIZE):
+            if cancelled():
+                raise SearchCancelled
+            matches.extend(
+                process.extractWithoutOrder(
+                    text,
+                    choices.slice(start, start + SEARCH_CHUNK_SIZE),
+                    score_cutoff=score_cutoff,
                 )
-            ],
-            key=operator.itemgetter(0),
-            reverse=True,
+            )
+        return matches
+
+    @staticmethod
+    def best_matches(matches, score_cutoff=SCORE_CUTOFF):
+        """Order matches by score, keeping the store order for equal scores.
+
+        Returns the (score, row) pairs of the MAX_RESULTS best matches.
+        """
+        indices = process.bestIndices(
+            (m[1] for m in matches), MAX_RESULTS, score_cutoff
+        )
+        return [(matches[index][1], matches[index][2]) for index in indices]
+
+    def cache_best_matches(self, key, best_matches):
+        # Results computed while the commands were changing are dropped
+        if key[0] == self.version:
+            self.query_cache.put(key, best_matches)
+
+    def promote(self, ranked, commands):
+        """Return the commands of ranked (score, row) pairs, reordered by usage.
+
+        The rows are those of commands, a CommandTable. The usage boost of
+        every command is added to its score, commands with equal boosted
+        scores keep their order.
+        """
+        frecencies = self.usage.frecencies()
+        if frecencies:
+            boosts = {
+                identity: frecency / (frecency + FRECENCY_HALF_BOOST)
+                for (identity, frecency) in frecencies.items()
+            }
+            ranked = sorted(
+                ranked,
+                key=lambda match: match[0]
+                + FRECENCY_MAX_BOOST * boosts.get(commands.identity(match[1]), 0),
+                reverse=True,
+            )
+        return CommandRows(commands, [row for (score, row) in ranked])
+
+    def create_search_session(self):
+        return SearchSession(self)
+
+
+class SearchSession:
+    """Refines the results of the previous query as the user types.
+
+    When the new query only appends characters to the last word of the
+    previous one, only the commands that matched the previous query are
+    scored again. Any other edit, including starting a new word, starts
+    over from the full command list.
+
+    WRatio is not monotonic as the query grows, so candidates are kept
+    using a lower score cutoff than the one used for display, which
+    keeps the refined results close to those of a full search.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.reset()
+
+    def reset(self):
+        self.query = None
+        self.candidates = None
+        self.command_set = None
+
+    def search(self, text, cancelled=None):
+        if not text.strip():
+            self.reset()
+            return self.store.get_default_commands()
+        key = None
+        if self.can_refine(text):
+            choices = self.candidates
+        else:
+            self.command_set = self.store.command_set
+            key = self.store.get_cache_key(text, self.command_set)
+            best_matches = self.store.query_cache.get(key)
+            if best_matches is not None:
+                # The next query is searched in full
+                self.query = text
+                self.candidates = None
+                return self.store.promote(best_matches, self.command_set[0])
+            choices = self.store.get_search_choices(text, self.command_set)
+        matches = self.store.score(
+            text, choices, score_cutoff=RETAIN_SCORE_CUTOFF, cancelled=cancelled
         )
-        return [k for (i, k) in results]
+        self.query = text
+        self.candidates = process.PreparedChoices(
+            {row: label for (label, score, row) in matches},
+            processor=choices.processor,
+        )
+        best_matches = self.store.best_matches(matches)
+        if key is not None:
+            self.store.cache_best_matches(key, best_matches)
+        return self.store.promote(best_matches, self.command_set[0])
+
+    def can_refine(self, text):
+        if self.candidates is None:
+            return False
+        if len(self.query.strip()) < MIN_REFINE_QUERY_LENGTH:
+            return False
+        if len(text) <= len(self.query) or not text.startswith(self.query):
+            return False
+        appended = text[len(self.query) - 1 :]
+        return not any(c.isspace() for c in appended)
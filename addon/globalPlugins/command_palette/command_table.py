@@ -0,0 +1,162 @@
+# coding: utf-8
+
+from array import array
+from collections.abc import Sequence
+from .command_interpreter import CommandInterpreter
+
+
+class CommandTable(Sequence):
+    """The commands of the palette, stored by column.
+
+    Every row holds the id of its category, its label, its command_info
+    and the id of its args. Categories and args are interned: rows with
+    equal args share the same dictionary. Indexing the table creates the
+    interpreter of a row, so interpreters only exist for the rows that
+    are displayed or run.
+    """
+
+    def __init__(self):
+        self.categories = []
+        self.category_ids = array("B")
+        self.labels = []
+        self.command_infos = []
+        self.args = []
+        self.args_ids = array("I")
+        self._category_lookup = {}
+        self._args_lookup = {}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return CommandRows(self, range(len(self))[row])
+        category, label, command_info, args = self.item(row)
+        return CommandInterpreter.create(
+            category=category,
+            label=label,
+            command_info=command_info,
+            args=dict(args),
+        )
+
+    def __add__(self, other):
+        """Return a table holding the rows of both tables."""
+        combined = self.slice(0, len(self))
+        # Translate the category ids of other into those of combined
+        category_map = bytes(map(combined._intern_category, other.categories))
+        category_map += bytes(256 - len(category_map))
+        combined.category_ids.frombytes(
+            other.category_ids.tobytes().translate(category_map)
+        )
+        args_map = [combined._intern_args(args) for args in other.args]
+        if args_map == list(range(len(args_map))):
+            combined.args_ids.extend(other.args_ids)
+        else:
+            combined.args_ids.extend(args_map[idx] for idx in other.args_ids)
+        combined.labels.extend(other.labels)
+        combined.command_infos.extend(other.command_infos)
+        return combined
+
+    def append(self, category, label, command_info, args=None):
+        self.category_ids.append(self._intern_category(category))
+        self.labels.append(label)
+        self.command_infos.append(command_info)
+        self.args_ids.append(self._intern_args(args or {}))
+
+    def _intern_category(self, category):
+        category_id = self._category_lookup.get(category)
+        if category_id is None:
+            category_id = self._category_lookup[category] = len(self.categories)
+            self.categories.append(category)
+        return category_id
+
+    def _intern_args(self, args):
+        key = repr(args)
+        args_id = self._args_lookup.get(key)
+        if args_id is None:
+            args_id = self._args_lookup[key] = len(self.args)
+            self.args.append(args)
+        return args_id
+
+    def item(self, row):
+        """Return the (category, label, command_info, args) of a row."""
+        return (
+            self.categories[self.category_ids[row]],
+            self.labels[row],
+            self.command_infos[row],
+            self.args[self.args_ids[row]],
+        )
+
+    def identity(self, row):
+        """Return the CommandInterpreter.identity of the command of a row."""
+        command_cls = CommandInterpreter.registered_categories[
+            self.categories[self.category_ids[row]]
+        ]
+        return command_cls.get_identity(self.labels[row], self.command_infos[row])
+
+    def find_rows(self, identities):
+        """Return {row: identity} for the commands having one of these identities."""
+        labels = {identity[1] for identity in identities}
+        rows = {}
+        for row, label in enumerate(self.labels):
+            if label in labels:
+                identity = self.identity(row)
+                if identity in identities:
+                    rows[row] = identity
+        return rows
+
+    def slice(self, start, stop):
+        """Return a table holding the rows from start to stop."""
+        part = type(self)()
+        part.categories = list(self.categories)
+        part.category_ids = self.category_ids[start:stop]
+        part.labels = self.labels[start:stop]
+        part.command_infos = self.command_infos[start:stop]
+        part.args = list(self.args)
+        part.args_ids = self.args_ids[start:stop]
+        part._category_lookup = dict(self._category_lookup)
+        part._args_lookup = dict(self._args_lookup)
+        return part
+
+    def to_content(self):
+        """Return the columns of this table as built-in types."""
+        return {
+            "categories": self.categories,
+            "category_ids": self.category_ids.tobytes(),
+            "labels": self.labels,
+            "command_infos": self.command_infos,
+            "args": self.args,
+            "args_ids": self.args_ids.tobytes(),
+        }
+
+    @classmethod
+    def from_content(cls, content):
+        """Return a table with the columns returned by to_content."""
+        table = cls()
+        table.categories = content["categories"]
+        table.category_ids.frombytes(content["category_ids"])
+        table.labels = content["labels"]
+        table.command_infos = content["command_infos"]
+        table.args = content["args"]
+        table.args_ids.frombytes(content["args_ids"])
+        table._category_lookup = {
+            category: idx for (idx, category) in enumerate(table.categories)
+        }
+        table._args_lookup = {repr(args): idx for (idx, args) in enumerate(table.args)}
+        return table
+
+
+class CommandRows(Sequence):
+    """The commands of some rows of a CommandTable, created when accessed."""
+
+    def __init__(self, table, rows):
+        self.table = table
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return CommandRows(self.table, self.rows[idx])
+        return self.table[self.rows[idx]]
@@ -3,11 +3,15 @@
 from dataclasses import dataclass
 import contextlib
 import typing as t
+from collections import OrderedDict
 import wx
 import wx.lib.mixins.listctrl as listmix
 
 
 ObjectCollection = t.Iterable[t.Any]
+DEFAULT_LIST_STYLE = wx.BORDER_SUNKEN | wx.LC_SINGLE_SEL | wx.LC_REPORT | wx.LC_VRULES
+# Number of rows whose labels are kept by virtual list views
+LABEL_CACHE_SIZE = 256
 
 
 class DialogListCtrl(wx.ListCtrl, listmix.ListCtrlAutoWidthMixin):
@@ -17,7 +21,7 @@ class DialogListCtrl(wx.ListCtrl, listmix.ListCtrlAutoWidthMixin):
         id,
         pos=wx.DefaultPosition,
         size=wx.DefaultSize,
-        style=wx.BORDER_SUNKEN | wx.LC_SINGLE_SEL | wx.LC_REPORT | wx.LC_VRULES,
+        style=DEFAULT_LIST_STYLE,
     ):
         wx.ListCtrl.__init__(self, parent, id, pos, size, style)
         listmix.ListCtrlAutoWidthMixin.__init__(self)
@@ -45,18 +49,27 @@ class ColumnDefn:
 
 
 class ImmutableObjectListView(DialogListCtrl):
-    """An immutable  list view that deals with objects rather than strings."""
+    """An immutable  list view that deals with objects rather than strings.
+
+    In virtual mode the list view only keeps a reference to the objects,
+    and the labels of each row are produced when the row is displayed.
+    """
 
     def __init__(
         self,
         *args,
         columns: t.Iterable[ColumnDefn] = (),
         objects: ObjectCollection = (),
+        virtual: bool = False,
         **kwargs,
     ):
+        if virtual:
+            kwargs["style"] = kwargs.get("style", DEFAULT_LIST_STYLE) | wx.LC_VIRTUAL
         super().__init__(*args, **kwargs)
+        self.is_virtual = virtual
         self._objects = None
         self._columns = None
+        self._label_cache = OrderedDict()
         self.Bind(wx.EVT_LIST_DELETE_ITEM, self.onDeleteItem, self)
         self.Bind(wx.EVT_LIST_DELETE_ALL_ITEMS, self.onDeleteAllItems, self)
         self.Bind(wx.EVT_LIST_INSERT_ITEM, self.onInsertItem, self)
@@ -82,19 +95,43 @@ class ImmutableObjectListView(DialogListCtrl):
 
     def set_objects(self, objects: ObjectCollection, focus_item: int = 0):
         """Clear the list view and insert the objects."""
+        if self.is_virtual:
+            if not isinstance(objects, t.Sequence):
+                objects = list(objects)
+            self._objects = objects
+            self._label_cache.clear()
+            self.SetItemCount(len(objects))
+            self.Refresh()
+            self.set_focused_item(focus_item)
+            return
         self._objects = objects
         self.set_columns(self._columns)
-        string_converters = [c.string_converter for c in self._columns]
         with self.__unsafe_modify():
             for obj in self._objects:
-                col_labels = []
-                for to_str in string_converters:
-                    col_labels.append(
-                        getattr(obj, to_str) if not callable(to_str) else to_str(obj)
-                    )
-                self.Append(col_labels)
+                self.Append(self.get_labels(obj))
         self.set_focused_item(focus_item)
 
+    def get_labels(self, obj) -> t.List[str]:
+        """Return the column labels of the given object."""
+        col_labels = []
+        for col in self._columns:
+            to_str = col.string_converter
+            col_labels.append(
+                getattr(obj, to_str) if not callable(to_str) else to_str(obj)
+            )
+        return col_labels
+
+    def OnGetItemText(self, item, col):
+        labels = self._label_cache.get(item)
+        if labels is None:
+            labels = self.get_labels(self._objects[item])
+            self._label_cache[item] = labels
+            if len(self._label_cache) > LABEL_CACHE_SIZE:
+                self._label_cache.popitem(last=False)
+        else:
+            self._label_cache.move_to_end(item)
+        return labels[col]
+
     def get_selected(self) -> t.Optional[t.Any]:
         """Return the currently selected object or None."""
         idx = self.GetFocusedItem()
@@ -0,0 +1,171 @@
+# coding: utf-8
+
+"""Timings of the stages of a search, from the keystroke to the list update.
+
+Nothing is timed unless ENABLED is True or the NVDA log level is set to
+debug, in which case `install` wraps the functions of every stage with a
+timer when the add-on starts. Otherwise they are left untouched, so the
+instrumentation costs nothing. The timings are written to the log by the
+"Log Search Timings" command, only offered when they are recorded, and
+when NVDA exits.
+"""
+
+import functools
+import logging
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from logHandler import log
+
+
+# Set to True to record the timings, which are also recorded when NVDA logs
+# at the debug level
+ENABLED = False
+# Number of the most recent timings kept for every stage
+HISTORY_SIZE = 1000
+# Upper bounds, in milliseconds, of the histogram buckets
+BUCKET_BOUNDS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class RollingHistogram:
+    """The distribution of the last `size` durations, in milliseconds."""
+
+    def __init__(self, size=HISTORY_SIZE):
+        self.durations = deque(maxlen=size)
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def __len__(self):
+        return len(self.durations)
+
+    def add(self, duration):
+        if len(self.durations) == self.durations.maxlen:
+            self.counts[bisect_right(BUCKET_BOUNDS, self.durations[0])] -= 1
+        self.durations.append(duration)
+        self.counts[bisect_right(BUCKET_BOUNDS, duration)] += 1
+
+    def percentile(self, percent):
+        """Return the nearest-rank percentile of the durations."""
+        durations = sorted(self.durations)
+        if not durations:
+            return 0.0
+        rank = max(0, -(-len(durations) * percent // 100) - 1)
+        return durations[int(rank)]
+
+    def summary(self):
+        buckets = " ".join(
+            f"<{bound}:{count}"
+            for (bound, count) in zip(BUCKET_BOUNDS, self.counts)
+            if count
+        )
+        if self.counts[-1]:
+            buckets += f" >={BUCKET_BOUNDS[-1]}:{self.counts[-1]}"
+        return (
+            f"n={len(self)} mean={sum(self.durations) / len(self):.2f} "
+            f"p50={self.percentile(50):.2f} p95={self.percentile(95):.2f} "
+            f"max={max(self.durations):.2f} | {buckets}"
+        )
+
+
+class Timings:
+    """Rolling histograms of the durations of the stages of a search."""
+
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+        self._keystroke_time = None
+        self._lock = threading.Lock()
+
+    def record(self, stage, duration):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = RollingHistogram()
+            histogram.add(duration * 1000)
+
+    def timed(self, stage, func):
+        """Return func, recording the duration of its calls in stage."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    def instrument(self, owner, name, stage):
+        """Replace the function owner.name by one timing its calls."""
+        func = vars(owner)[name]
+        if isinstance(func, staticmethod):
+            setattr(owner, name, staticmethod(self.timed(stage, func.__func__)))
+        else:
+            setattr(owner, name, self.timed(stage, func))
+
+    def instrument_keystrokes(self, owner, on_text, on_render):
+        """Time from the last call of owner.on_text to the end of owner.on_render."""
+        text_func = vars(owner)[on_text]
+        render_func = vars(owner)[on_render]
+
+        @functools.wraps(text_func)
+        def text_wrapper(*args, **kwargs):
+            self._keystroke_time = time.perf_counter()
+            return text_func(*args, **kwargs)
+
+        @functools.wraps(render_func)
+        def render_wrapper(*args, **kwargs):
+            try:
+                return render_func(*args, **kwargs)
+            finally:
+                keystroke_time, self._keystroke_time = self._keystroke_time, None
+                if keystroke_time is not None:
+                    self.record("keystroke", time.perf_counter() - keystroke_time)
+
+        setattr(owner, on_text, text_wrapper)
+        setattr(owner, on_render, render_wrapper)
+
+    def report(self):
+        with self._lock:
+            lines = [
+                f"{stage}: {histogram.summary()}"
+                for (stage, histogram) in self.histograms.items()
+                if histogram
+            ]
+        if not lines:
+            return "No command palette searches were timed"
+        lines.insert(0, "Command palette search timings, in milliseconds:")
+        return "\n".join(lines)
+
+    def log_report(self):
+        log.info(self.report())
+
+
+timings = Timings()
+
+
+def install():
+    """Time the stages of the searches if enabled, otherwise do nothing.
+
+    This must be called before the palette dialog is created.
+    """
+    if timings.enabled or not (ENABLED or log.isEnabledFor(logging.DEBUG)):
+        return
+    from .command_store import CommandStore, SearchSession, process
+    from .command_palette import CommandPaletteDialog
+
+    timings.instrument(CommandStore, "get_cache_key", "normalize")
+    timings.instrument(CommandStore, "get_search_choices", "candidates")
+    timings.instrument(CommandStore, "score", "score")
+    timings.instrument(process, "extractBestIndices", "extract")
+    timings.instrument(CommandStore, "best_matches", "sort")
+    timings.instrument(CommandStore, "promote", "promote")
+    timings.instrument(CommandStore, "filter_by", "filter_by")
+    timings.instrument(SearchSession, "search", "session_search")
+    timings.instrument(CommandPaletteDialog, "populate_command_list", "populate")
+    timings.instrument(CommandPaletteDialog, "announce", "announce")
+    timings.instrument_keystrokes(
+        CommandPaletteDialog, "onCommandEntryText", "onSearchResults"
+    )
+    timings.enabled = True
@@ -0,0 +1,167 @@
+# coding: utf-8
+
+import json
+import re
+
+
+# Records can not be longer than this, which bounds the memory used
+MAX_RECORD_SIZE = 1 << 20
+WHITESPACE = " \t\r\n"
+# Errors this close to the end of the text may be due to a truncated literal
+TRUNCATION_MARGIN = 8
+
+
+class JSONRecordReader:
+    """Reads the records of JSON text one at a time.
+
+    The text is either a JSON array, whose items are the records, or JSON
+    lines, each line being a record. It is given as an iterable of
+    chunks of text, and only the current chunk and the current record
+    are kept in memory.
+
+    Iterating yields (line_number, record) pairs, and reads all the
+    chunks. A record that is not
+    valid JSON is skipped: its line number and the error are appended to
+    `errors`, and reading resumes on the next line starting a record. In
+    an array, that is the next line starting with "{" indented like the
+    skipped record, or with the "]" closing the array.
+    """
+
+    def __init__(self, chunks, max_record_size=MAX_RECORD_SIZE):
+        self.chunks = chunks
+        self.max_record_size = max_record_size
+        self.errors = []
+
+    def __iter__(self):
+        self._chunk_iter = iter(self.chunks)
+        self._buffer = ""
+        self._pos = 0
+        # The line number at _line_pos in the buffer
+        self._line = 1
+        self._line_pos = 0
+        self._eof = False
+        decoder = json.JSONDecoder()
+        if not self._skip(WHITESPACE):
+            return
+        in_array = self._buffer[self._pos] == "["
+        if in_array:
+            self._pos += 1
+        separators = WHITESPACE + "," if in_array else WHITESPACE
+        while self._skip(separators):
+            if in_array and self._buffer[self._pos] == "]":
+                self._pos += 1
+                if self._skip(WHITESPACE):
+                    self.errors.append((self._line_at(self._pos), "Extra data"))
+                while self._read():
+                    pass
+                return
+            line = self._line_at(self._pos)
+            indent = self._indent
+            try:
+                record = self._decode(decoder)
+            except ValueError as e:
+                self.errors.append((line, getattr(e, "msg", str(e))))
+                self._resync(array_record_start(indent) if in_array else None)
+                continue
+            yield line, record
+        if in_array:
+            self.errors.append((self._line_at(self._pos), "Unterminated array"))
+
+    def _read(self):
+        """Read the next chunk, return False at the end of the text."""
+        if self._eof:
+            return False
+        chunk = next(self._chunk_iter, None)
+        if chunk is None:
+            self._eof = True
+            return False
+        self._line_at(self._pos)
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        self._line_pos = 0
+        return True
+
+    def _skip(self, chars):
+        """Skip chars, return False if the end of the text is reached.
+
+        Sets _indent to the spaces and tabs that precede the new position
+        on its line, or to None if other characters precede it.
+        """
+        indent = None
+        while True:
+            buffer = self._buffer
+            start = pos = self._pos
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            skipped = buffer[start:pos]
+            line_break = skipped.rfind("\n")
+            if line_break != -1:
+                indent = skipped[line_break + 1 :]
+            elif indent is not None:
+                indent += skipped
+            self._pos = pos
+            if pos < len(buffer):
+                if indent is not None and indent.strip(" \t"):
+                    indent = None
+                self._indent = indent
+                return True
+            if not self._read():
+                return False
+
+    def _decode(self, decoder):
+        while True:
+            try:
+                record, self._pos = decoder.raw_decode(self._buffer, self._pos)
+                return record
+            except json.JSONDecodeError as e:
+                # The record may continue in the next chunk
+                truncated = e.msg.startswith("Unterminated string") or (
+                    e.pos >= len(self._buffer) - TRUNCATION_MARGIN
+                )
+                if not truncated:
+                    raise
+                if len(self._buffer) - self._pos >= self.max_record_size:
+                    raise
+                if not self._read():
+                    raise
+
+    def _resync(self, record_start=None):
+        """Move to the next line that may start a record.
+
+        In an array, record_start is a pattern matching that line.
+        """
+        while True:
+            if record_start:
+                match = record_start.search(self._buffer, self._pos)
+                if match is not None:
+                    self._pos = match.start(match.lastindex)
+                    return
+            else:
+                end = self._buffer.find("\n", self._pos)
+                if end != -1:
+                    self._pos = end + 1
+                    return
+            # Keep the last line, it may continue in the next chunk
+            line_start = self._buffer.rfind("\n", self._pos)
+            self._pos = len(self._buffer) if line_start == -1 else line_start
+            if not self._read():
+                self._pos = len(self._buffer)
+                return
+
+    def _line_at(self, pos):
+        """Return the line number at pos, which can not be before the last one."""
+        self._line += self._buffer.count("\n", self._line_pos, pos)
+        self._line_pos = pos
+        return self._line
+
+
+def array_record_start(indent):
+    """Return a pattern matching the lines starting an array item or closing it.
+
+    Items are expected to be indented by indent, and the closing bracket
+    to be less indented. If indent is None, any indentation matches.
+    """
+    if indent is None:
+        return re.compile(r"\n[ \t]*([{\]])")
+    closing_indent = f"[ \\t]{{0,{len(indent) - 1}}}" if indent else ""
+    return re.compile(rf"\n{re.escape(indent)}(\{{)|\n{closing_indent}(\])")
@@ -1,4 +1,9 @@
-from Levenshtein import _levenshtein
-from Levenshtein._levenshtein import *
+try:
+    from Levenshtein import _levenshtein
+    from Levenshtein._levenshtein import *
+except ImportError:
+    # No compiled module for this interpreter, use the pure Python one
+    from Levenshtein import _pylevenshtein as _levenshtein
+    from Levenshtein._pylevenshtein import *
 
 __doc__ = _levenshtein.__doc__
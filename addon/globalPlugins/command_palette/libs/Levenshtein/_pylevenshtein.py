@@ -0,0 +1,307 @@
+# encoding: utf-8
+"""A pure Python implementation of the python-Levenshtein functions used by fuzzywuzzy.
+
+It is used when the compiled _levenshtein module is not available for the
+running interpreter, so that the scores are the same on every platform. distance() and ratio() are computed with bit-parallel
+algorithms (Myers/Hyyrö for the edit distance, Allison-Dix/Hyyrö for the
+longest common subsequence), which process one character of the second
+string per step using Python integers as bit vectors. The edit operations
+are recovered by walking back through the cost matrix encoded in the bit
+vectors of every column, following the same rules as the C implementation
+so that the results are identical.
+"""
+
+__all__ = ["distance", "ratio", "editops", "opcodes", "matching_blocks"]
+
+
+def _pattern_masks(s):
+    """Return a mapping of each character of s to a bit mask of its positions."""
+    masks = {}
+    bit = 1
+    for c in s:
+        masks[c] = masks.get(c, 0) | bit
+        bit <<= 1
+    return masks
+
+
+def _masked_lcs_length(masks, length, s2):
+    """Return the length of the longest common subsequence of s2 and the
+    string of the given length whose _pattern_masks are masks."""
+    mask = (1 << length) - 1
+    v = mask
+    for c in s2:
+        u = v & masks.get(c, 0)
+        v = ((v + u) | (v - u)) & mask
+    return bin(~v & mask).count("1")
+
+
+def _lcs_length(s1, s2):
+    """Return the length of the longest common subsequence of s1 and s2."""
+    if len(s1) > len(s2):
+        s1, s2 = s2, s1
+    if not s1:
+        return 0
+    return _masked_lcs_length(_pattern_masks(s1), len(s1), s2)
+
+
+def distance(s1, s2):
+    """Compute absolute Levenshtein distance of two strings.
+
+    distance(string1, string2)
+    """
+    if len(s1) > len(s2):
+        s1, s2 = s2, s1
+    if not s1:
+        return len(s2)
+    masks = _pattern_masks(s1)
+    mask = (1 << len(s1)) - 1
+    last = 1 << (len(s1) - 1)
+    pv = mask
+    mv = 0
+    score = len(s1)
+    for c in s2:
+        eq = masks.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+    return score
+
+
+def ratio(s1, s2):
+    """Compute similarity of two strings.
+
+    ratio(string1, string2)
+
+    The similarity is a number between 0 and 1, it's usually equal or
+    somewhat higher than difflib.SequenceMatcher.ratio(), because it's
+    based on real minimal edit distance.
+    """
+    lensum = len(s1) + len(s2)
+    if not lensum:
+        return 1.0
+    return 2.0 * _lcs_length(s1, s2) / lensum
+
+
+def _column_deltas(s1, s2):
+    """Run Myers' algorithm over s2, keeping the deltas of every column.
+
+    With D the cost matrix of s1 (rows) against s2 (columns), bit i-1 of
+    pvs[j] (mvs[j]) is set when D[i][j] - D[i-1][j] is +1 (-1), and bit i
+    of phs[j] (mhs[j]) is set when D[i][j] - D[i][j-1] is +1 (-1).
+    """
+    masks = _pattern_masks(s1)
+    mask = (1 << len(s1)) - 1
+    pv = mask
+    mv = 0
+    pvs = [pv]
+    mvs = [mv]
+    phs = [0]
+    mhs = [0]
+    for c in s2:
+        eq = masks.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = ((mv | ~(xh | pv)) << 1) | 1
+        mh = (pv & xh) << 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+        pvs.append(pv)
+        mvs.append(mv)
+        phs.append(ph)
+        mhs.append(mh)
+    return pvs, mvs, phs, mhs
+
+
+def _find_editops(s1, s2):
+    len1, len2 = len(s1), len(s2)
+    # Strip the common prefix and suffix
+    offset = 0
+    while offset < len1 and offset < len2 and s1[offset] == s2[offset]:
+        offset += 1
+    while len1 > offset and len2 > offset and s1[len1 - 1] == s2[len2 - 1]:
+        len1 -= 1
+        len2 -= 1
+    s1 = s1[offset:len1]
+    s2 = s2[offset:len2]
+    pvs, mvs, phs, mhs = _column_deltas(s1, s2)
+
+    # Find the way back, preferring to continue in the same direction.
+    # The costs of the neighbouring cells are derived from the deltas.
+    ops = []
+    i = len(s1)
+    j = len(s2)
+    direction = 0
+    current = _distance_from_deltas(pvs[j], mvs[j], i) + j
+    while i or j:
+        if not i:
+            # Only insertions are left on the first row
+            ops.extend(("insert", offset, k + offset) for k in range(j - 1, -1, -1))
+            break
+        if not j:
+            # and only deletions on the first column
+            ops.extend(("delete", k + offset, offset) for k in range(i - 1, -1, -1))
+            break
+        left = current - ((phs[j] >> i) & 1) + ((mhs[j] >> i) & 1)
+        up = current - ((pvs[j] >> (i - 1)) & 1) + ((mvs[j] >> (i - 1)) & 1)
+        if direction < 0 and current == left + 1:
+            j -= 1
+            current = left
+            ops.append(("insert", i + offset, j + offset))
+            continue
+        if direction > 0 and current == up + 1:
+            i -= 1
+            current = up
+            ops.append(("delete", i + offset, j + offset))
+            continue
+        diagonal = left - ((pvs[j - 1] >> (i - 1)) & 1) + ((mvs[j - 1] >> (i - 1)) & 1)
+        if current == diagonal and s1[i - 1] == s2[j - 1]:
+            i -= 1
+            j -= 1
+            current = diagonal
+            direction = 0
+            continue
+        if current == diagonal + 1:
+            i -= 1
+            j -= 1
+            current = diagonal
+            ops.append(("replace", i + offset, j + offset))
+            direction = 0
+            continue
+        if direction == 0 and current == left + 1:
+            j -= 1
+            current = left
+            ops.append(("insert", i + offset, j + offset))
+            direction = -1
+            continue
+        if direction == 0 and current == up + 1:
+            i -= 1
+            current = up
+            ops.append(("delete", i + offset, j + offset))
+            direction = 1
+            continue
+        raise AssertionError("Lost in the cost matrix")
+    ops.reverse()
+    return ops
+
+
+def _distance_from_deltas(pv, mv, rows):
+    """Return D[rows][j] - D[0][j] given the vertical deltas of column j."""
+    low = (1 << rows) - 1
+    return bin(pv & low).count("1") - bin(mv & low).count("1")
+
+
+def _length(s):
+    return s if isinstance(s, int) else len(s)
+
+
+def _opcodes_to_editops(ops):
+    result = []
+    for tag, sbeg, send, dbeg, dend in ops:
+        if tag == "replace":
+            result.extend(("replace", sbeg + k, dbeg + k) for k in range(send - sbeg))
+        elif tag == "delete":
+            result.extend(("delete", sbeg + k, dbeg) for k in range(send - sbeg))
+        elif tag == "insert":
+            result.extend(("insert", sbeg, dbeg + k) for k in range(dend - dbeg))
+    return result
+
+
+def _editops_to_opcodes(ops, len1, len2):
+    result = []
+    spos = dpos = 0
+    idx = 0
+    count = len(ops)
+    while idx < count:
+        tag, i, j = ops[idx]
+        if spos < i or dpos < j:
+            result.append(("equal", spos, i, dpos, j))
+            spos, dpos = i, j
+        sbeg, dbeg = spos, dpos
+        while idx < count and tuple(ops[idx]) == (tag, spos, dpos):
+            if tag != "insert":
+                spos += 1
+            if tag != "delete":
+                dpos += 1
+            idx += 1
+        result.append((tag, sbeg, spos, dbeg, dpos))
+    if spos < len1 or dpos < len2:
+        result.append(("equal", spos, len1, dpos, len2))
+    return result
+
+
+def editops(*args):
+    """Find sequence of edit operations transforming one string to another.
+
+    editops(source_string, destination_string)
+    editops(opcodes, source_length, destination_length)
+
+    The result is a list of triples (operation, spos, dpos), where
+    operation is one of 'replace', 'insert', or 'delete'.
+    """
+    if len(args) == 3:
+        ops = args[0]
+        if ops and len(ops[0]) == 5:
+            return _opcodes_to_editops(ops)
+        return list(ops)
+    s1, s2 = args
+    return _find_editops(s1, s2)
+
+
+def opcodes(*args):
+    """Find sequence of edit operations transforming one string to another.
+
+    opcodes(source_string, destination_string)
+    opcodes(editops, source_length, destination_length)
+
+    The result is a list of 5-tuples with the same meaning as in
+    SequenceMatcher's get_opcodes() output.
+    """
+    if len(args) == 3:
+        ops, s1, s2 = args
+        if ops and len(ops[0]) == 5:
+            return list(ops)
+    else:
+        s1, s2 = args
+        ops = _find_editops(s1, s2)
+    return _editops_to_opcodes(ops, _length(s1), _length(s2))
+
+
+def matching_blocks(edit_operations, source, destination):
+    """Find identical blocks in two strings.
+
+    matching_blocks(edit_operations, source_length, destination_length)
+
+    The result is a list of triples with the same meaning as in
+    SequenceMatcher's get_matching_blocks() output. The edit operations
+    can be either editops or opcodes.
+    """
+    len1 = _length(source)
+    len2 = _length(destination)
+    blocks = []
+    if edit_operations and len(edit_operations[0]) == 5:
+        for tag, sbeg, send, dbeg, dend in edit_operations:
+            if tag == "equal":
+                blocks.append((sbeg, dbeg, send - sbeg))
+    else:
+        spos = dpos = 0
+        for tag, i, j in edit_operations:
+            if spos < i or dpos < j:
+                blocks.append((spos, dpos, i - spos))
+                spos, dpos = i, j
+            if tag != "insert":
+                spos += 1
+            if tag != "delete":
+                dpos += 1
+        if spos < len1 or dpos < len2:
+            blocks.append((spos, dpos, len1 - spos))
+    blocks.append((len1, len2, 0))
+    return blocks
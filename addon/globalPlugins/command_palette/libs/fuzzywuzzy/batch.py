@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Score a query against all the choices of a PreparedChoices at once.
+
+This needs NumPy, which is optional: when it can not be imported,
+``available`` is False and the choices are scored one at a time.
+
+The processed choices are packed into a matrix of code points with one
+column per choice, padded to the length of the longest one. The length
+of the longest common subsequence of the query and of every choice is
+computed in a single pass over the rows with the bit-parallel algorithm
+of Levenshtein._pylevenshtein, the query being the bit pattern. This
+gives fuzz.ratio, as computed by the Levenshtein based StringMatcher,
+for every choice. For partial_ratio and WRatio, it gives upper bounds
+of the score, and only the choices that may reach the score cutoff are
+then scored one at a time.
+"""
+
+from __future__ import unicode_literals
+from . import fuzz
+from . import utils
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from .StringMatcher import StringMatcher
+except ImportError:
+    StringMatcher = None
+
+
+available = numpy is not None
+
+# Smaller collections of choices are scored faster one at a time
+MIN_CHOICES = 64
+
+# The query is the bit pattern, so it has to fit in 64 bits
+MAX_QUERY_LENGTH = 64
+
+_ratio_scorers = (fuzz.ratio, fuzz.QRatio, fuzz.UQRatio)
+_wratio_scorers = (fuzz.WRatio, fuzz.UWRatio)
+_bounded_scorers = _wratio_scorers + (fuzz.partial_ratio,)
+
+
+class ChoiceMatrix(object):
+    """The processed choices packed into NumPy arrays.
+
+    Attributes:
+        alphabet: The sorted code points found in the choices.
+        codes: A (width, count) array. The characters of each choice are
+            stored in its column as 1 + their index in alphabet, followed
+            by zeros.
+        lengths: The length of each choice.
+        token_ids: A (count, max tokens) array of the ids of the unique
+            tokens of each choice, padded with -1.
+        joined_lengths: The length of the unique tokens of each choice
+            joined with spaces.
+        vocabulary: A dictionary of tokens to their ids.
+    """
+
+    def __init__(self, processed=None):
+        if processed is None:
+            return
+        count = len(processed)
+        self.lengths = numpy.fromiter(map(len, processed), numpy.int64, count)
+        width = int(self.lengths.max()) if count else 0
+        padded = "".join(s.ljust(width, "\0") for s in processed)
+        points = numpy.frombuffer(padded.encode("utf-32-le"), dtype=numpy.uint32)
+        self.alphabet, inverse = numpy.unique(points, return_inverse=True)
+        dtype = numpy.uint16 if len(self.alphabet) < 0xFFFF else numpy.uint32
+        codes = (inverse.astype(dtype) + 1).reshape(count, width)
+        codes[numpy.arange(width) >= self.lengths[:, None]] = 0
+        self.codes = numpy.ascontiguousarray(codes.T)
+        self.vocabulary = {}
+        token_sets = [_tokens(s) for s in processed]
+        max_tokens = max(map(len, token_sets), default=0)
+        self.token_ids = numpy.full((count, max_tokens), -1, dtype=numpy.int32)
+        self.joined_lengths = numpy.zeros(count, dtype=numpy.int64)
+        for row, tokens in enumerate(token_sets):
+            ids = [self.vocabulary.setdefault(t, len(self.vocabulary)) for t in tokens]
+            self.token_ids[row, : len(ids)] = ids
+            self.joined_lengths[row] = fuzz._joined_length(tokens) if tokens else 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def subset(self, index):
+        """Return a ChoiceMatrix of the choices selected by a slice or indices."""
+        part = ChoiceMatrix()
+        part.alphabet = self.alphabet
+        part.vocabulary = self.vocabulary
+        part.lengths = self.lengths[index]
+        width = int(part.lengths.max()) if len(part.lengths) else 0
+        part.codes = numpy.ascontiguousarray(self.codes[:width, index])
+        part.token_ids = self.token_ids[index]
+        part.joined_lengths = self.joined_lengths[index]
+        return part
+
+    def char_indices(self, query):
+        """Return the indices in codes of the characters of query, 0 if absent."""
+        points = numpy.array([ord(c) for c in query], dtype=numpy.uint32)
+        found = numpy.searchsorted(self.alphabet, points)
+        found[found == len(self.alphabet)] = 0
+        present = self.alphabet[found] == points if len(self.alphabet) else False
+        return numpy.where(present, found + 1, 0)
+
+    def lcs_lengths(self, query, indices):
+        """Return the lengths of the longest common subsequences with query."""
+        table = numpy.zeros(len(self.alphabet) + 1, dtype=numpy.uint64)
+        for bit, index in enumerate(indices):
+            if index:
+                table[index] |= numpy.uint64(1 << bit)
+        mask = numpy.uint64((1 << len(query)) - 1)
+        v = numpy.full(len(self), mask, dtype=numpy.uint64)
+        for row in self.codes:
+            u = v & table[row]
+            v = ((v + u) | (v - u)) & mask
+        return _popcount(~v & mask)
+
+    def char_overlaps(self, query, indices):
+        """Return the number of characters every choice has in common with query."""
+        overlaps = numpy.zeros(len(self), dtype=numpy.int64)
+        values, counts = numpy.unique(indices, return_counts=True)
+        for index, count in zip(values, counts):
+            if index:
+                overlaps += numpy.minimum((self.codes == index).sum(axis=0), count)
+        return overlaps
+
+    def shares_token(self, query):
+        """Return whether every choice has a token in common with query."""
+        ids = [self.vocabulary[t] for t in _tokens(query) if t in self.vocabulary]
+        if not ids:
+            return numpy.zeros(len(self), dtype=bool)
+        return numpy.isin(self.token_ids, ids).any(axis=1)
+
+
+def _tokens(s):
+    if isinstance(s, utils.PreparedString):
+        return s.tokens
+    return frozenset(s.split())
+
+
+_M1 = numpy.uint64(0x5555555555555555) if available else None
+_M2 = numpy.uint64(0x3333333333333333) if available else None
+_M4 = numpy.uint64(0x0F0F0F0F0F0F0F0F) if available else None
+_H01 = numpy.uint64(0x0101010101010101) if available else None
+
+
+def _popcount(values):
+    if hasattr(numpy, "bitwise_count"):
+        return numpy.bitwise_count(values).astype(numpy.int64)
+    values = values - ((values >> numpy.uint64(1)) & _M1)
+    values = (values & _M2) + ((values >> numpy.uint64(2)) & _M2)
+    values = (values + (values >> numpy.uint64(4))) & _M4
+    return ((values * _H01) >> numpy.uint64(56)).astype(numpy.int64)
+
+
+def _partial_bounds(overlaps, shortest):
+    """fuzz._partial_bound for arrays."""
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        bounds = 2.0 * overlaps / (shortest + overlaps)
+    return numpy.where(shortest <= overlaps, 1.0, bounds)
+
+
+def _intr(values):
+    """utils.intr for arrays, numpy.round also rounds half to even."""
+    return numpy.round(values).astype(numpy.int64)
+
+
+def supports(scorer, query, choices):
+    """Return True if score() can score query against the choices."""
+    return (
+        available
+        and scorer in _ratio_scorers + _bounded_scorers
+        and fuzz.SequenceMatcher is StringMatcher
+        and len(choices) >= MIN_CHOICES
+        and 0 < len(query) <= MAX_QUERY_LENGTH
+    )
+
+
+def score(query, choices, scorer, score_cutoff=0):
+    """Return an array of the scores of the processed query for each choice.
+
+    The choices are a PreparedChoices, and supports() must be True for
+    the arguments. As with the score_cutoff argument of the scorers,
+    scores lower than score_cutoff may be replaced by 0.
+    """
+    if choices.matrix is None:
+        choices.matrix = ChoiceMatrix(choices.processed)
+    matrix = choices.matrix
+    indices = matrix.char_indices(query)
+    common = matrix.lcs_lengths(query, indices)
+    lengths = matrix.lengths
+    ratios = _intr(100 * (2.0 * common / (len(query) + lengths)))
+    if scorer in _ratio_scorers:
+        return ratios
+    shortest = numpy.minimum(lengths, len(query))
+    partial = _intr(100 * _partial_bounds(common, shortest))
+    if scorer is fuzz.partial_ratio:
+        keep = partial >= score_cutoff
+    else:
+        threshold = score_cutoff - 0.5 if score_cutoff > 0 else 0
+        keep = _wratio_bounds(query, matrix, ratios, partial) >= threshold
+    keep &= lengths > 0
+    scores = numpy.zeros(len(matrix), dtype=numpy.int64)
+    if scorer in _wratio_scorers:
+        scorer_args = {"full_process": False}
+    else:
+        scorer = fuzz._partial_ratio
+        scorer_args = {}
+    if score_cutoff > 0:
+        scorer_args["score_cutoff"] = score_cutoff
+    processed = choices.processed
+    for index in numpy.flatnonzero(keep).tolist():
+        scores[index] = scorer(query, processed[index], **scorer_args)
+    return scores
+
+
+def matches(query, choices, scorer, score_cutoff=0, limit=None):
+    """Return the indices and the scores of the choices scoring score_cutoff or more.
+
+    Without a limit, they are in the order of the choices. Otherwise,
+    the best `limit` choices are returned by decreasing score, in the
+    order of the choices for equal scores, like heapq.nlargest.
+    """
+    scores = score(query, choices, scorer, score_cutoff)
+    indices = numpy.flatnonzero(scores >= score_cutoff)
+    if limit is not None:
+        order = numpy.argsort(-scores[indices], kind="stable")
+        indices = indices[order[:limit]]
+    return indices.tolist(), scores[indices].tolist()
+
+
+def _wratio_bounds(query, matrix, ratios, partial):
+    """Upper bounds of the unrounded WRatio of query and every choice.
+
+    These are the bounds of fuzz._wratio_bound, where the ratio is exact
+    and the partial_ratio is bounded by the common subsequence instead
+    of the common characters.
+    """
+    lengths = matrix.lengths
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        len_ratio = numpy.maximum(lengths, len(query)) / numpy.minimum(
+            lengths, len(query)
+        )
+    try_partial = len_ratio >= 1.5
+    partial_scale = numpy.where(len_ratio > 8, 0.6, 0.9)
+    unbase_scale = 0.95
+    token_scale = numpy.where(try_partial, unbase_scale * partial_scale, unbase_scale)
+    # The token based ratios, when the choice shares no token with query
+    overlaps = matrix.char_overlaps(query, matrix.char_indices(query))
+    query_tokens = _tokens(query)
+    query_length = fuzz._joined_length(query_tokens) if query_tokens else 0
+    joined = matrix.joined_lengths
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        token_bounds = numpy.where(
+            try_partial,
+            _intr(100 * _partial_bounds(overlaps, numpy.minimum(joined, query_length))),
+            _intr(200.0 * overlaps / (joined + query_length)),
+        )
+    token_bounds = numpy.where(matrix.shares_token(query), 100, token_bounds)
+    bounds = numpy.maximum(ratios, token_bounds * token_scale)
+    return numpy.where(
+        try_partial, numpy.maximum(bounds, partial * partial_scale), bounds
+    )
@@ -3,6 +3,7 @@
 from __future__ import unicode_literals
 import platform
 import warnings
+from collections import Counter
 
 try:
     from .StringMatcher import StringMatcher as SequenceMatcher
@@ -13,6 +14,7 @@ except ImportError:
         )
     from difflib import SequenceMatcher
 
+from Levenshtein._pylevenshtein import _masked_lcs_length, _pattern_masks
 from . import utils
 
 
@@ -21,11 +23,57 @@ from . import utils
 ###########################
 
 
+# All the scorers accept a score_cutoff argument. When they can tell that
+# the score is going to be lower than score_cutoff they stop and return 0.
+
+
+def _char_overlap(s1, s2):
+    """Return the number of characters the two strings have in common.
+
+    This is the size of the intersection of their character multisets,
+    so no alignment of the two strings can match more characters.
+    """
+    if len(s1) > len(s2):
+        s1, s2 = s2, s1
+    overlap = 0
+    for c in set(s1):
+        count1 = s1.count(c)
+        count2 = s2.count(c)
+        overlap += count1 if count1 < count2 else count2
+    return overlap
+
+
+def _partial_bound(overlap, shortest):
+    """Upper bound of partial_ratio / 100 for two strings that have `overlap`
+    characters in common, the shorter of which has `shortest` characters."""
+    if shortest <= overlap:
+        return 1.0
+    return 2.0 * overlap / (shortest + overlap)
+
+
 @utils.check_for_none
 @utils.check_for_equivalence
 @utils.check_empty_string
-def ratio(s1, s2):
+def ratio(s1, s2, score_cutoff=0):
     s1, s2 = utils.make_type_consistent(s1, s2)
+    return _ratio(s1, s2, score_cutoff)
+
+
+def _ratio(s1, s2, score_cutoff=0):
+    """ratio of two str, without the decorators and make_type_consistent.
+
+    The scorers of this module and process call it to save these calls.
+    """
+    if s1 == s2:
+        return 100
+    if not s1 or not s2:
+        return 0
+
+    if score_cutoff > 0:
+        # Same as SequenceMatcher.real_quick_ratio
+        bound = 200.0 * min(len(s1), len(s2)) / (len(s1) + len(s2))
+        if utils.intr(bound) < score_cutoff:
+            return 0
 
     m = SequenceMatcher(None, s1, s2)
     return utils.intr(100 * m.ratio())
@@ -34,10 +82,19 @@ def ratio(s1, s2):
 @utils.check_for_none
 @utils.check_for_equivalence
 @utils.check_empty_string
-def partial_ratio(s1, s2):
+def partial_ratio(s1, s2, score_cutoff=0):
     """ "Return the ratio of the most similar substring
     as a number between 0 and 100."""
     s1, s2 = utils.make_type_consistent(s1, s2)
+    return _partial_ratio(s1, s2, score_cutoff)
+
+
+def _partial_ratio(s1, s2, score_cutoff=0):
+    """partial_ratio of two str, without the decorators and make_type_consistent."""
+    if s1 == s2:
+        return 100
+    if not s1 or not s2:
+        return 0
 
     if len(s1) <= len(s2):
         shorter = s1
@@ -46,6 +103,13 @@ def partial_ratio(s1, s2):
         shorter = s2
         longer = s1
 
+    # No window can have a ratio above this bound
+    ceiling = 1.0
+    if score_cutoff > 0:
+        ceiling = _partial_bound(_char_overlap(shorter, longer), len(shorter))
+        if utils.intr(100 * ceiling) < score_cutoff:
+            return 0
+
     m = SequenceMatcher(None, shorter, longer)
     blocks = m.get_matching_blocks()
 
@@ -55,20 +119,95 @@ def partial_ratio(s1, s2):
     #   e.g. shorter = "abcd", longer = XXXbcdeEEE
     #   block = (1,3,3)
     #   best score === ratio("abcd", "Xbcd")
-    scores = []
+    # Identical windows are compared once, those of the longest blocks first
+    windows = {}
     for block in blocks:
         long_start = block[1] - block[0] if (block[1] - block[0]) > 0 else 0
-        long_end = long_start + len(shorter)
-        long_substr = longer[long_start:long_end]
+        window = longer[long_start : long_start + len(shorter)]
+        if windows.get(window, -1) < block[2]:
+            windows[window] = block[2]
+
+    best = 0.0
+    for window in sorted(windows, key=windows.__getitem__, reverse=True):
+        m.set_seqs(shorter, window)
+        r = m.ratio()
+        if r > 0.995:
+            return 100
+        if r > best:
+            best = r
+            if best >= ceiling:
+                break
+
+    return utils.intr(100 * best)
+
+
+@utils.check_for_none
+@utils.check_for_equivalence
+@utils.check_empty_string
+def sliding_partial_ratio(s1, s2, score_cutoff=0):
+    """Return the ratio of the most similar window of the longer string
+    as a number between 0 and 100.
+
+    Every window of the longer string as long as the shorter one is
+    compared, along with the shorter windows at its end, rather than
+    only those aligned with matching blocks. The ratio of a window is
+    2 * LCS / (total length), the ratio of the Levenshtein backend, so
+    the score is never lower than partial_ratio with that backend.
+
+    The character overlap of every window, which bounds its LCS, is
+    updated in a single pass over the longer string. The LCS of the
+    windows that may beat the best ratio so far, highest bound first, is
+    computed with a bit-parallel algorithm on the masks of the shorter
+    string, which are built once.
+    """
+    s1, s2 = utils.make_type_consistent(s1, s2)
+
+    if len(s1) <= len(s2):
+        shorter = s1
+        longer = s2
+    else:
+        shorter = s2
+        longer = s1
+    length = len(shorter)
+
+    # The overlap of the window starting at every position
+    needed = Counter(shorter)
+    counts = Counter()
+    overlap = 0
+    for c in longer[:length]:
+        if counts[c] < needed[c]:
+            overlap += 1
+        counts[c] += 1
+    bounds = []
+    for start in range(len(longer)):
+        window_length = min(length, len(longer) - start)
+        bounds.append(2.0 * overlap / (length + window_length))
+        c = longer[start]
+        counts[c] -= 1
+        if counts[c] < needed[c]:
+            overlap -= 1
+        if start + length < len(longer):
+            c = longer[start + length]
+            if counts[c] < needed[c]:
+                overlap += 1
+            counts[c] += 1
+
+    if score_cutoff > 0 and utils.intr(100 * max(bounds)) < score_cutoff:
+        return 0
 
-        m2 = SequenceMatcher(None, shorter, long_substr)
-        r = m2.ratio()
+    masks = _pattern_masks(shorter)
+    best = 0.0
+    for start in sorted(range(len(bounds)), key=bounds.__getitem__, reverse=True):
+        if bounds[start] <= best:
+            break
+        window = longer[start : start + length]
+        lcs = _masked_lcs_length(masks, length, window)
+        r = 2.0 * lcs / (length + len(window))
         if r > 0.995:
             return 100
-        else:
-            scores.append(r)
+        best = max(best, r)
 
-    return utils.intr(100 * max(scores))
+    return utils.intr(100 * best)
 
 
 ##############################
@@ -76,52 +215,73 @@ def partial_ratio(s1, s2):
 ##############################
 
 
+def _tokens(s):
+    """Return the set of tokens of a processed string."""
+    return utils.prepared(s).tokens
+
+
+def _joined_length(tokens):
+    """Return the length of the tokens joined with spaces."""
+    return sum(map(len, tokens)) + len(tokens) - 1
+
+
 def _process_and_sort(s, force_ascii, full_process=True):
     """Return a cleaned string with token sorted."""
-    # pull tokens
     ts = utils.full_process(s, force_ascii=force_ascii) if full_process else s
-    tokens = ts.split()
-
-    # sort tokens and join
-    sorted_string = " ".join(sorted(tokens))
-    return sorted_string.strip()
+    return utils.prepared(ts).sorted_tokens
 
 
 # Sorted Token
 #   find all alphanumeric tokens in the string
 #   sort those tokens and take ratio of resulting joined strings
 #   controls for unordered string elements
-@utils.check_for_none
-def _token_sort(s1, s2, partial=True, force_ascii=True, full_process=True):
+def _token_sort(
+    s1, s2, partial=True, force_ascii=True, full_process=True, score_cutoff=0
+):
     sorted1 = _process_and_sort(s1, force_ascii, full_process=full_process)
     sorted2 = _process_and_sort(s2, force_ascii, full_process=full_process)
 
     if partial:
-        return partial_ratio(sorted1, sorted2)
+        return _partial_ratio(sorted1, sorted2, score_cutoff=score_cutoff)
     else:
-        return ratio(sorted1, sorted2)
+        return _ratio(sorted1, sorted2, score_cutoff=score_cutoff)
 
 
-def token_sort_ratio(s1, s2, force_ascii=True, full_process=True):
+@utils.check_for_none
+def token_sort_ratio(s1, s2, force_ascii=True, full_process=True, score_cutoff=0):
     """Return a measure of the sequences' similarity between 0 and 100
     but sorting the token before comparing.
     """
     return _token_sort(
-        s1, s2, partial=False, force_ascii=force_ascii, full_process=full_process
+        s1,
+        s2,
+        partial=False,
+        force_ascii=force_ascii,
+        full_process=full_process,
+        score_cutoff=score_cutoff,
     )
 
 
-def partial_token_sort_ratio(s1, s2, force_ascii=True, full_process=True):
+@utils.check_for_none
+def partial_token_sort_ratio(
+    s1, s2, force_ascii=True, full_process=True, score_cutoff=0
+):
     """Return the ratio of the most similar substring as a number between
     0 and 100 but sorting the token before comparing.
     """
     return _token_sort(
-        s1, s2, partial=True, force_ascii=force_ascii, full_process=full_process
+        s1,
+        s2,
+        partial=True,
+        force_ascii=force_ascii,
+        full_process=full_process,
+        score_cutoff=score_cutoff,
     )
 
 
-@utils.check_for_none
-def _token_set(s1, s2, partial=True, force_ascii=True, full_process=True):
+def _token_set(
+    s1, s2, partial=True, force_ascii=True, full_process=True, score_cutoff=0
+):
     """Find all alphanumeric tokens in each string...
     - treat them as a set
     - construct two strings of the form:
@@ -140,17 +300,15 @@ def _token_set(s1, s2, partial=True, force_ascii=True, full_process=True):
     if not utils.validate_string(p2):
         return 0
 
-    # pull tokens
-    tokens1 = set(p1.split())
-    tokens2 = set(p2.split())
-
-    intersection = tokens1.intersection(tokens2)
-    diff1to2 = tokens1.difference(tokens2)
-    diff2to1 = tokens2.difference(tokens1)
+    # pull tokens, already sorted
+    p1 = utils.prepared(p1)
+    p2 = utils.prepared(p2)
+    tokens1 = p1.tokens
+    tokens2 = p2.tokens
 
-    sorted_sect = " ".join(sorted(intersection))
-    sorted_1to2 = " ".join(sorted(diff1to2))
-    sorted_2to1 = " ".join(sorted(diff2to1))
+    sorted_sect = " ".join([t for t in p1.unique_tokens if t in tokens2])
+    sorted_1to2 = " ".join([t for t in p1.unique_tokens if t not in tokens2])
+    sorted_2to1 = " ".join([t for t in p2.unique_tokens if t not in tokens1])
 
     combined_1to2 = sorted_sect + " " + sorted_1to2
     combined_2to1 = sorted_sect + " " + sorted_2to1
@@ -161,27 +319,44 @@ def _token_set(s1, s2, partial=True, force_ascii=True, full_process=True):
     combined_2to1 = combined_2to1.strip()
 
     if partial:
-        ratio_func = partial_ratio
+        ratio_func = _partial_ratio
     else:
-        ratio_func = ratio
+        ratio_func = _ratio
 
-    pairwise = [
-        ratio_func(sorted_sect, combined_1to2),
-        ratio_func(sorted_sect, combined_2to1),
-        ratio_func(combined_1to2, combined_2to1),
-    ]
-    return max(pairwise)
+    pairwise = (
+        (sorted_sect, combined_1to2),
+        (sorted_sect, combined_2to1),
+        (combined_1to2, combined_2to1),
+    )
+    best = 0
+    for a, b in pairwise:
+        best = max(best, ratio_func(a, b, score_cutoff=max(score_cutoff, best)))
+    return best
 
 
-def token_set_ratio(s1, s2, force_ascii=True, full_process=True):
+@utils.check_for_none
+def token_set_ratio(s1, s2, force_ascii=True, full_process=True, score_cutoff=0):
     return _token_set(
-        s1, s2, partial=False, force_ascii=force_ascii, full_process=full_process
+        s1,
+        s2,
+        partial=False,
+        force_ascii=force_ascii,
+        full_process=full_process,
+        score_cutoff=score_cutoff,
     )
 
 
-def partial_token_set_ratio(s1, s2, force_ascii=True, full_process=True):
+@utils.check_for_none
+def partial_token_set_ratio(
+    s1, s2, force_ascii=True, full_process=True, score_cutoff=0
+):
     return _token_set(
-        s1, s2, partial=True, force_ascii=force_ascii, full_process=full_process
+        s1,
+        s2,
+        partial=True,
+        force_ascii=force_ascii,
+        full_process=full_process,
+        score_cutoff=score_cutoff,
     )
 
 
@@ -190,7 +365,7 @@ def partial_token_set_ratio(s1, s2, force_ascii=True, full_process=True):
 ###################
 
 # q is for quick
-def QRatio(s1, s2, force_ascii=True, full_process=True):
+def QRatio(s1, s2, force_ascii=True, full_process=True, score_cutoff=0):
     """
     Quick ratio comparison between two strings.
 
@@ -201,6 +376,7 @@ def QRatio(s1, s2, force_ascii=True, full_process=True):
     :param s2:
     :param force_ascii: Allow only ASCII characters (Default: True)
     :full_process: Process inputs, used here to avoid double processing in extract functions (Default: True)
+    :score_cutoff: Return 0 as soon as the ratio is known to be lower than this (Default: 0)
     :return: similarity ratio
     """
 
@@ -215,11 +391,12 @@ def QRatio(s1, s2, force_ascii=True, full_process=True):
         return 0
     if not utils.validate_string(p2):
         return 0
+    p1, p2 = utils.make_type_consistent(p1, p2)
 
-    return ratio(p1, p2)
+    return _ratio(p1, p2, score_cutoff=score_cutoff)
 
 
-def UQRatio(s1, s2, full_process=True):
+def UQRatio(s1, s2, full_process=True, score_cutoff=0):
     """
     Unicode quick ratio
 
@@ -229,11 +406,43 @@ def UQRatio(s1, s2, full_process=True):
     :param s2:
     :return: similarity ratio
     """
-    return QRatio(s1, s2, force_ascii=False, full_process=full_process)
+    return QRatio(
+        s1,
+        s2,
+        force_ascii=False,
+        full_process=full_process,
+        score_cutoff=score_cutoff,
+    )
+
+
+def _wratio_bound(p1, p2, try_partial, partial_scale, unbase_scale):
+    """Upper bound of the unrounded WRatio of two processed strings.
+
+    It is based on the number of characters the strings have in common.
+    Unless the strings share a token, the token based ratios compare
+    strings built from the tokens of either side, which have at most
+    those characters in common and are at least as long as the joined
+    unique tokens. The ratios are rounded before being scaled, so the
+    bounds are rounded the same way.
+    """
+    overlap = _char_overlap(p1, p2)
+    base_bound = 200.0 * overlap / (len(p1) + len(p2))
+    tokens1 = _tokens(p1)
+    tokens2 = _tokens(p2)
+    if tokens1 & tokens2:
+        token_bound = 100 * (partial_scale if try_partial else unbase_scale)
+        return max(base_bound, token_bound)
+    length1 = _joined_length(tokens1)
+    length2 = _joined_length(tokens2)
+    if try_partial:
+        bound = utils.intr(100 * _partial_bound(overlap, min(length1, length2)))
+        return max(base_bound, bound * partial_scale)
+    bound = utils.intr(200.0 * overlap / (length1 + length2))
+    return max(base_bound, bound * unbase_scale)
 
 
 # w is for weighted
-def WRatio(s1, s2, force_ascii=True, full_process=True):
+def WRatio(s1, s2, force_ascii=True, full_process=True, score_cutoff=0):
     """
     Return a measure of the sequences' similarity between 0 and 100, using different algorithms.
 
@@ -265,6 +474,8 @@ def WRatio(s1, s2, force_ascii=True, full_process=True):
     :param force_ascii: Allow only ascii characters
     :type force_ascii: bool
     :full_process: Process inputs, used here to avoid double processing in extract functions (Default: True)
+    :score_cutoff: Skip the remaining ratios as soon as the result is known to be lower than this,
+        in which case 0 is returned (Default: 0)
     :return:
     """
 
@@ -279,13 +490,13 @@ def WRatio(s1, s2, force_ascii=True, full_process=True):
         return 0
     if not utils.validate_string(p2):
         return 0
+    p1, p2 = utils.make_type_consistent(p1, p2)
 
     # should we look at partials?
     try_partial = True
     unbase_scale = 0.95
     partial_scale = 0.90
 
-    base = ratio(p1, p2)
     len_ratio = float(max(len(p1), len(p2))) / min(len(p1), len(p2))
 
     # if strings are similar length, don't use partials
@@ -296,29 +507,74 @@ def WRatio(s1, s2, force_ascii=True, full_process=True):
     if len_ratio > 8:
         partial_scale = 0.6
 
-    if try_partial:
-        partial = partial_ratio(p1, p2) * partial_scale
-        ptsor = (
-            partial_token_sort_ratio(p1, p2, full_process=False)
-            * unbase_scale
-            * partial_scale
-        )
-        ptser = (
-            partial_token_set_ratio(p1, p2, full_process=False)
-            * unbase_scale
-            * partial_scale
-        )
-
-        return utils.intr(max(base, partial, ptsor, ptser))
-    else:
-        tsor = token_sort_ratio(p1, p2, full_process=False) * unbase_scale
-        tser = token_set_ratio(p1, p2, full_process=False) * unbase_scale
-
-        return utils.intr(max(base, tsor, tser))
+    # The lowest unrounded score that can still be rounded up to score_cutoff
+    threshold = score_cutoff - 0.5 if score_cutoff > 0 else 0
+    if threshold > 0:
+        bound = _wratio_bound(p1, p2, try_partial, partial_scale, unbase_scale)
+        if bound < threshold:
+            return 0
 
+    # Each ratio is skipped when the best score so far is already as high
+    # as it can scale to, and told to give up when it can't beat it.
+    best = _ratio(p1, p2, score_cutoff=threshold)
 
-def UWRatio(s1, s2, full_process=True):
+    if try_partial:
+        token_scale = unbase_scale * partial_scale
+        if best < 100 * partial_scale:
+            cutoff = max(threshold, best) / partial_scale
+            partial = _partial_ratio(p1, p2, score_cutoff=cutoff) * partial_scale
+            best = max(best, partial)
+        if best < 100 * token_scale:
+            cutoff = max(threshold, best) / token_scale
+            ptsor = (
+                _token_sort(
+                    p1, p2, partial=True, full_process=False, score_cutoff=cutoff
+                )
+                * token_scale
+            )
+            best = max(best, ptsor)
+        if best < 100 * token_scale:
+            cutoff = max(threshold, best) / token_scale
+            ptser = (
+                _token_set(
+                    p1, p2, partial=True, full_process=False, score_cutoff=cutoff
+                )
+                * token_scale
+            )
+            best = max(best, ptser)
+
+        return utils.intr(best)
+    else:
+        if best < 100 * unbase_scale:
+            cutoff = max(threshold, best) / unbase_scale
+            tsor = (
+                _token_sort(
+                    p1, p2, partial=False, full_process=False, score_cutoff=cutoff
+                )
+                * unbase_scale
+            )
+            best = max(best, tsor)
+        if best < 100 * unbase_scale:
+            cutoff = max(threshold, best) / unbase_scale
+            tser = (
+                _token_set(
+                    p1, p2, partial=False, full_process=False, score_cutoff=cutoff
+                )
+                * unbase_scale
+            )
+            best = max(best, tser)
+
+        return utils.intr(best)
+
+
+def UWRatio(s1, s2, full_process=True, score_cutoff=0):
     """Return a measure of the sequences' similarity between 0 and 100,
     using different algorithms. Same as WRatio but preserving unicode.
     """
-    return WRatio(s1, s2, force_ascii=False, full_process=full_process)
+    return WRatio(
+        s1,
+        s2,
+        force_ascii=False,
+        full_process=full_process,
+        score_cutoff=score_cutoff,
+    )
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 # encoding: utf-8
+from . import batch
 from . import fuzz
 from . import utils
 import heapq
@@ -13,6 +14,132 @@ default_scorer = fuzz.WRatio
 default_processor = utils.full_process
 
 
+# Scorers that run full_process on their arguments unless told otherwise
+_full_process_scorers = (
+    fuzz.WRatio,
+    fuzz.QRatio,
+    fuzz.token_set_ratio,
+    fuzz.token_sort_ratio,
+    fuzz.partial_token_set_ratio,
+    fuzz.partial_token_sort_ratio,
+    fuzz.UWRatio,
+    fuzz.UQRatio,
+)
+
+# Scorers that accept a score_cutoff and may stop early when it can't be reached
+_cutoff_scorers = _full_process_scorers + (
+    fuzz.ratio,
+    fuzz.partial_ratio,
+    fuzz.sliding_partial_ratio,
+)
+
+# Undecorated kernels of the scorers, for str arguments
+_kernels = {fuzz.ratio: fuzz._ratio, fuzz.partial_ratio: fuzz._partial_ratio}
+
+
+class PreparedChoices(object):
+    """Choices that have been processed and tokenized ahead of time.
+
+    Build this once for a collection of choices that does not change
+    between queries, and pass it as the ``choices`` argument of the
+    extract functions. Each choice is run through ``processor`` and
+    stored as a utils.PreparedString, so the per-query work is limited
+    to processing the query and scoring.
+
+    Arguments:
+        choices: A list or dictionary of choices, as accepted by extract().
+        processor: Function used to process both the choices and, later,
+            the query. Defaults to full_process with force_ascii=True,
+            which is what fuzz.WRatio and friends expect.
+
+    The extract functions return the choices as given, which are kept in
+    ``originals``. When ``originals`` is None, as for choices assembled
+    from processed strings, the processed choices are returned instead.
+
+    When NumPy is available, the choices are also packed into a
+    batch.ChoiceMatrix the first time they are scored by a scorer the
+    batch module supports.
+    """
+
+    def __init__(self, choices, processor=None):
+        self.processor = processor or partial(utils.full_process, force_ascii=True)
+        self.matrix = None
+        try:
+            items = choices.items()
+        except AttributeError:
+            self.keys = None
+            self.originals = list(choices)
+            self.processed = [self.prepare(choice) for choice in self.originals]
+        else:
+            self.keys = []
+            self.originals = []
+            self.processed = []
+            for key, choice in items:
+                self.keys.append(key)
+                self.originals.append(choice)
+                self.processed.append(self.prepare(choice))
+        # Choices assembled by setting processed have no originals
+        self.originals = self.originals or None
+
+    def __len__(self):
+        return len(self.processed)
+
+    def __add__(self, other):
+        """Return the choices of both, which must have been prepared alike."""
+        combined = PreparedChoices((), processor=self.processor)
+        keys, other_keys = self.keys, other.keys
+        if isinstance(keys, range) and isinstance(other_keys, range):
+            # Contiguous ranges of keys, such as row numbers, stay a range
+            if keys.step == 1 == other_keys.step and keys.stop == other_keys.start:
+                combined.keys = range(keys.start, other_keys.stop)
+            else:
+                combined.keys = list(keys) + list(other_keys)
+        elif keys is not None:
+            combined.keys = keys + other_keys
+        combined.processed = self.processed + other.processed
+        if self.originals is not None or other.originals is not None:
+            combined.originals = self.matches() + other.matches()
+        return combined
+
+    def slice(self, start, stop):
+        """Return a PreparedChoices holding the choices from start to stop."""
+        part = PreparedChoices((), processor=self.processor)
+        part.keys = None if self.keys is None else self.keys[start:stop]
+        part.processed = self.processed[start:stop]
+        if self.originals is not None:
+            part.originals = self.originals[start:stop]
+        if self.matrix is not None:
+            part.matrix = self.matrix.subset(slice(start, stop))
+        return part
+
+    def select(self, indices):
+        """Return a PreparedChoices holding the choices at the given indices."""
+        part = PreparedChoices((), processor=self.processor)
+        if self.keys is not None:
+            part.keys = [self.keys[i] for i in indices]
+        part.processed = [self.processed[i] for i in indices]
+        if self.originals is not None:
+            part.originals = [self.originals[i] for i in indices]
+        if self.matrix is not None:
+            part.matrix = self.matrix.subset(list(indices))
+        return part
+
+    def matches(self):
+        """Return the list of the choices returned by the extract functions."""
+        return self.processed if self.originals is None else self.originals
+
+    def prepare(self, choice):
+        """Process a single choice or query the same way as the choices.
+
+        Strings that are already prepared are returned unchanged, which
+        allows building a smaller PreparedChoices out of the processed
+        choices yielded for choices without originals.
+        """
+        if isinstance(choice, utils.PreparedString):
+            return choice
+        return utils.PreparedString(self.processor(choice))
+
+
 def extractWithoutOrder(
     query, choices, processor=default_processor, scorer=default_scorer, score_cutoff=0
 ):
@@ -27,7 +154,10 @@ def extractWithoutOrder(
         choices: An iterable or dictionary-like object containing choices
             to be matched against the query. Dictionary arguments of
             {key: value} pairs will attempt to match the query against
-            each value.
+            each value. A PreparedChoices instance can be passed to skip
+            processing the choices; its own processor is then used for the
+            query and the ``processor`` argument is ignored. The matches
+            are still the choices it was built from.
         processor: Optional function of the form f(a) -> b, where a is the query or
             individual choice and b is the choice to be used in matching.
 
@@ -71,6 +201,11 @@ def extractWithoutOrder(
     except TypeError:
         pass
 
+    if isinstance(choices, PreparedChoices):
+        for match in _extract_prepared(query, choices, scorer, score_cutoff):
+            yield match
+        return
+
     # If the processor was removed by setting it to None
     # perfom a noop as it still needs to be a function
     if processor is None:
@@ -87,27 +222,21 @@ def extractWithoutOrder(
         )
 
     # Don't run full_process twice
-    if (
-        scorer
-        in [
-            fuzz.WRatio,
-            fuzz.QRatio,
-            fuzz.token_set_ratio,
-            fuzz.token_sort_ratio,
-            fuzz.partial_token_set_ratio,
-            fuzz.partial_token_sort_ratio,
-            fuzz.UWRatio,
-            fuzz.UQRatio,
-        ]
-        and processor == utils.full_process
-    ):
+    if scorer in _full_process_scorers and processor == utils.full_process:
         processor = no_process
 
+    # Let the scorer give up early on hopeless choices
+    if scorer in _cutoff_scorers and score_cutoff > 0:
+        scorer = partial(scorer, score_cutoff=score_cutoff)
+        scorer_func = scorer.func
+    else:
+        scorer_func = scorer
+
     # Only process the query once instead of for every choice
-    if scorer in [fuzz.UWRatio, fuzz.UQRatio]:
+    if scorer_func in [fuzz.UWRatio, fuzz.UQRatio]:
         pre_processor = partial(utils.full_process, force_ascii=False)
         scorer = partial(scorer, full_process=False)
-    elif scorer in [
+    elif scorer_func in [
         fuzz.WRatio,
         fuzz.QRatio,
         fuzz.token_set_ratio,
@@ -120,6 +249,9 @@ def extractWithoutOrder(
     else:
         pre_processor = no_process
     processed_query = pre_processor(processed_query)
+    if pre_processor is not no_process:
+        # Tokenize the query once for the token based scorers
+        processed_query = utils.prepared(processed_query)
 
     try:
         # See if choices is a dictionary-like object.
@@ -137,6 +269,63 @@ def extractWithoutOrder(
                 yield (choice, score)
 
 
+def _extract_prepared(query, choices, scorer, score_cutoff):
+    """extractWithoutOrder for PreparedChoices.
+
+    The choices are already processed, so only the query goes through
+    the processor.
+    """
+    processed_query = _prepare_query(query, choices)
+    if batch.supports(scorer, processed_query, choices):
+        indices, scores = batch.matches(processed_query, choices, scorer, score_cutoff)
+        for index, score in zip(indices, scores):
+            yield _prepared_match(choices, index, score)
+        return
+    scorer = _prepared_scorer(scorer, score_cutoff)
+    matches = choices.matches()
+    if choices.keys is None:
+        for choice, processed in zip(matches, choices.processed):
+            score = scorer(processed_query, processed)
+            if score >= score_cutoff:
+                yield (choice, score)
+    else:
+        for key, choice, processed in zip(choices.keys, matches, choices.processed):
+            score = scorer(processed_query, processed)
+            if score >= score_cutoff:
+                yield (choice, score, key)
+
+
+def _prepare_query(query, choices):
+    processed_query = choices.prepare(query)
+    if len(processed_query) == 0:
+        logging.warning(
+            u"Applied processor reduces input query to empty string, "
+            "all comparisons will have score 0. "
+            "[Query: '{0}']".format(query)
+        )
+    return processed_query
+
+
+def _prepared_scorer(scorer, score_cutoff):
+    """Return scorer set up to score PreparedChoices."""
+    if scorer in _full_process_scorers:
+        if score_cutoff > 0:
+            return partial(scorer, full_process=False, score_cutoff=score_cutoff)
+        return partial(scorer, full_process=False)
+    # The query and the choices are str, so the checks can be skipped
+    kernel = _kernels.get(scorer, scorer)
+    if scorer in _cutoff_scorers and score_cutoff > 0:
+        return partial(kernel, score_cutoff=score_cutoff)
+    return kernel
+
+
+def _prepared_match(choices, index, score):
+    choice = choices.matches()[index]
+    if choices.keys is None:
+        return (choice, score)
+    return (choice, score, choices.keys[index])
+
+
 def extract(
     query, choices, processor=default_processor, scorer=default_scorer, limit=5
 ):
@@ -218,6 +407,16 @@ def extractBests(
 
     Returns: A a list of (match, score) tuples.
     """
+    if isinstance(choices, PreparedChoices):
+        processed_query = choices.prepare(query)
+        if batch.supports(scorer, processed_query, choices):
+            indices, scores = batch.matches(
+                processed_query, choices, scorer, score_cutoff, limit=limit
+            )
+            return [
+                _prepared_match(choices, index, score)
+                for index, score in zip(indices, scores)
+            ]
 
     best_list = extractWithoutOrder(query, choices, processor, scorer, score_cutoff)
     return (
@@ -227,6 +426,94 @@ def extractBests(
     )
 
 
+def bestIndices(scores, limit=None, score_cutoff=0):
+    """Return the indices of the highest of an iterable of scores.
+
+    The indices are ordered by decreasing score, and by increasing index
+    for equal scores, which is the order of extractBests. Only `limit`
+    scores at most are kept while iterating, in a heap of
+    (score, -index) pairs.
+
+    Args:
+        scores: An iterable of scores.
+        limit: Optional maximum for the number of indices returned.
+        score_cutoff: Scores lower than this are left out. Defaults to 0.
+
+    Returns: A list of indices into scores.
+    """
+    return [index for (index, score) in _best_scores(scores, limit, score_cutoff)]
+
+
+def _best_scores(scores, limit, score_cutoff):
+    heap = []
+    for index, score in enumerate(scores):
+        if score < score_cutoff:
+            continue
+        if limit is None or len(heap) < limit:
+            heap.append((score, -index))
+            if limit is not None and len(heap) == limit:
+                heapq.heapify(heap)
+        elif (score, -index) > heap[0]:
+            heapq.heapreplace(heap, (score, -index))
+    heap.sort(reverse=True)
+    return [(-negated_index, score) for (score, negated_index) in heap]
+
+
+def extractBestIndices(query, choices, scorer=default_scorer, score_cutoff=0, limit=5):
+    """Get the indices and scores of the best matches in a PreparedChoices.
+
+    Same as extractBests, except that (index, score) pairs are returned,
+    the index being the position of the choice in choices. No list of
+    matches is built.
+
+    Args:
+        query: A string to match against
+        choices: A PreparedChoices.
+        scorer: Scoring function for extract().
+        score_cutoff: Optional argument for score threshold. No matches with
+            a score less than this number will be returned. Defaults to 0.
+        limit: Optional maximum for the number of elements returned. Defaults
+            to 5.
+
+    Returns: A list of (index, score) tuples, ordered by decreasing score.
+    """
+    processed_query = _prepare_query(query, choices)
+    if batch.supports(scorer, processed_query, choices):
+        indices, scores = batch.matches(
+            processed_query, choices, scorer, score_cutoff, limit=limit
+        )
+        return list(zip(indices, scores))
+    score = _prepared_scorer(scorer, score_cutoff)
+    return _best_scores(
+        (score(processed_query, processed) for processed in choices.processed),
+        limit,
+        score_cutoff,
+    )
+
+
+def extractBestKeys(query, choices, scorer=default_scorer, score_cutoff=0, limit=5):
+    """Get the keys of the best matches in a PreparedChoices.
+
+    Same as extractBests, except that neither scores nor matches are
+    returned, only the keys of the matching choices, or the choices if
+    there are no keys.
+
+    Args:
+        query: A string to match against
+        choices: A PreparedChoices.
+        scorer: Scoring function for extract().
+        score_cutoff: Optional argument for score threshold. No matches with
+            a score less than this number will be returned. Defaults to 0.
+        limit: Optional maximum for the number of elements returned. Defaults
+            to 5.
+
+    Returns: A list of keys, ordered by decreasing score.
+    """
+    matches = extractBestIndices(query, choices, scorer, score_cutoff, limit)
+    keys = choices.matches() if choices.keys is None else choices.keys
+    return [keys[index] for (index, score) in matches]
+
+
 def extractOne(
     query, choices, processor=default_processor, scorer=default_scorer, score_cutoff=0
 ):
@@ -1,12 +1,18 @@
 from __future__ import unicode_literals
 import sys
 import functools
+import unicodedata
 
 from fuzzywuzzy.string_processing import StringProcessor
 
 
 PY3 = sys.version_info[0] == 3
 
+# Number of processed strings whose tokens are kept by prepared()
+TOKEN_CACHE_SIZE = 2048
+# Bump when full_process or fold_process process a string differently
+PROCESSOR_VERSION = 1
+
 
 def validate_string(s):
     """
@@ -85,6 +91,14 @@ def make_type_consistent(s1, s2):
         return unicode(s1), unicode(s2)
 
 
+# full_process of each ASCII character, a space for those that are neither
+# letters nor numbers and the lower case of the others
+_ascii_full_process_table = "".join(
+    " " if StringProcessor.regex.match(chr(code)) else chr(code).lower()
+    for code in range(128)
+)
+
+
 def full_process(s, force_ascii=False):
     """Process string by
     -- removing all but letters and numbers
@@ -92,6 +106,10 @@ def full_process(s, force_ascii=False):
     -- force to lower case
     if force_ascii == True, force convert to ascii"""
 
+    # Translating ASCII strings is several times faster than the regex,
+    # the result is the same
+    if isinstance(s, str) and s.isascii():
+        return s.translate(_ascii_full_process_table).strip()
     if force_ascii:
         s = asciidammit(s)
     # Keep only Letters and Numbers (see Unicode docs).
@@ -103,6 +121,104 @@ def full_process(s, force_ascii=False):
     return string_out
 
 
+# The block of the combining diacritical marks, removed by fold_process
+ACCENTS_START = 0x0300
+ACCENTS_END = 0x036F
+
+
+class _FoldTable(dict):
+    """Translation table of fold_process, filled as characters are met.
+
+    The combining diacritical marks, which NFKD separates from accented
+    Latin, Greek and Cyrillic letters, are removed. The other marks are
+    kept, as they are part of the letters of their scripts, such as the
+    virama of Devanagari or the voicing marks of kana. Letters and numbers
+    are kept too, and the other characters become spaces.
+    """
+
+    def __missing__(self, code):
+        c = chr(code)
+        if ACCENTS_START <= code <= ACCENTS_END:
+            folded = None
+        elif unicodedata.category(c).startswith("M"):
+            folded = c
+        elif StringProcessor.regex.match(c):
+            folded = " "
+        else:
+            folded = c
+        self[code] = folded
+        return folded
+
+
+_fold_table = _FoldTable()
+
+
+def fold_process(s):
+    """Process string like full_process, but keep the letters and numbers
+    that are not ASCII without their accents, and fold their case.
+
+    The string is decomposed with NFKD and casefolded, so "É", "é" and "e"
+    are all processed to "e", as "ß" and "ss" are to "ss". Only the
+    accents of Latin, Greek and Cyrillic letters are removed, the marks
+    of the other scripts are kept.
+    """
+    if s.isascii():
+        return full_process(s)
+    s = unicodedata.normalize("NFKD", s).casefold()
+    return s.translate(_fold_table).strip()
+
+
+class PreparedString(str):
+    """A string that went through full_process along with its tokens.
+
+    The token set and the sorted token string are computed once so that
+    the token based scorers do not need to split and sort it again when
+    they are called with full_process=False. The sorted unique tokens
+    are computed the first time they are needed.
+    """
+
+    def __new__(cls, processed):
+        self = super(PreparedString, cls).__new__(cls, processed)
+        tokens = processed.split()
+        self.tokens = frozenset(tokens)
+        self.sorted_tokens = " ".join(sorted(tokens)).strip()
+        return self
+
+    @classmethod
+    def restore(cls, processed, sorted_tokens):
+        """Rebuild a PreparedString from its processed and sorted_tokens strings."""
+        self = str.__new__(cls, processed)
+        self.tokens = frozenset(sorted_tokens.split())
+        self.sorted_tokens = sorted_tokens
+        return self
+
+    @property
+    def unique_tokens(self):
+        """The tokens of the set, sorted."""
+        try:
+            return self._unique_tokens
+        except AttributeError:
+            self._unique_tokens = tuple(sorted(self.tokens))
+            return self._unique_tokens
+
+
+@functools.lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _prepared(processed):
+    return PreparedString(processed)
+
+
+def prepared(processed):
+    """Return a processed string as a PreparedString.
+
+    The PreparedStrings of the last TOKEN_CACHE_SIZE plain strings are
+    kept, so the tokens of a string compared to many others, such as a
+    query, are only computed once.
+    """
+    if isinstance(processed, PreparedString):
+        return processed
+    return _prepared(processed)
+
+
 def intr(n):
     """Returns a correctly rounded integer"""
     return int(round(n))
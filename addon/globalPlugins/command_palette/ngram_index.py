@@ -0,0 +1,81 @@
+# coding: utf-8
+
+from collections import Counter, defaultdict
+
+
+class NgramIndex:
+    """An inverted index of the character n-grams of prepared choices.
+
+    It is used to pick the choices that are worth scoring for a query:
+    only the choices sharing at least one n-gram with the processed query
+    are considered, ranked by the number of n-grams they share with it.
+    Queries shorter than `min_query_length` are not selective enough, and
+    `candidates` returns None for them so that the caller scans all the
+    choices.
+
+    When `base` is an index with the same n of the first choices, its
+    postings are copied and only the other choices are indexed.
+    """
+
+    def __init__(
+        self, choices, n=2, max_candidates=None, min_query_length=None, base=None
+    ):
+        self.choices = choices
+        self.n = n
+        self.max_candidates = max_candidates
+        self.min_query_length = min_query_length or n
+        self.postings = defaultdict(list)
+        start = 0
+        if base is not None:
+            for gram, indices in base.postings.items():
+                self.postings[gram] = list(indices)
+            start = len(base.choices)
+        for idx in range(start, len(choices)):
+            for gram in self.ngrams(choices.processed[idx]):
+                self.postings[gram].append(idx)
+
+    @classmethod
+    def from_postings(cls, choices, postings, **kwargs):
+        """Return an index of choices using postings saved from an index of them."""
+        index = cls(choices.slice(0, 0), **kwargs)
+        index.choices = choices
+        index.postings.update(postings)
+        return index
+
+    def updated_postings(self, choices, moved):
+        """Return the postings of an index of choices, derived from this one.
+
+        moved maps the indices of the choices of this index that are also
+        in choices to their new index. The other choices are indexed.
+        """
+        postings = defaultdict(list)
+        for gram, indices in self.postings.items():
+            kept = [moved[idx] for idx in indices if idx in moved]
+            if kept:
+                postings[gram] = kept
+        added = set(range(len(choices))).difference(moved.values())
+        for idx in added:
+            for gram in self.ngrams(choices.processed[idx]):
+                postings[gram].append(idx)
+        for indices in postings.values():
+            indices.sort()
+        return postings
+
+    def ngrams(self, text):
+        n = self.n
+        return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+    def candidates(self, query):
+        """Return the prepared choices worth scoring for query, in index order."""
+        processed = self.choices.prepare(query)
+        if len(processed) < self.min_query_length:
+            return None
+        counts = Counter()
+        for gram in self.ngrams(processed):
+            counts.update(self.postings.get(gram, ()))
+        if self.max_candidates is not None and len(counts) > self.max_candidates:
+            indices = [idx for idx, shared in counts.most_common(self.max_candidates)]
+        else:
+            indices = list(counts)
+        indices.sort()
+        return self.choices.select(indices)
@@ -0,0 +1,73 @@
+# coding: utf-8
+
+import threading
+import wx
+from concurrent.futures import ThreadPoolExecutor
+from logHandler import log
+from .command_store import SearchCancelled
+
+
+class SearchWorker:
+    """Runs the searches of a SearchSession off the GUI thread.
+
+    Every call to `search` starts a new generation. A search that belongs
+    to an older generation is abandoned as soon as it notices, and its
+    result, if any, is never delivered. Results are delivered on the GUI
+    thread by calling `on_result(text, commands)`.
+    """
+
+    def __init__(self, session, on_result):
+        self.session = session
+        self.on_result = on_result
+        self._generation = 0
+        self._delivered = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="command_palette_search"
+        )
+
+    def _next_generation(self):
+        with self._lock:
+            self._generation += 1
+            return self._generation
+
+    def is_stale(self, generation):
+        return generation != self._generation
+
+    def is_pending(self):
+        """Return True if the newest search has not been delivered yet."""
+        return self._delivered != self._generation
+
+    def search(self, text):
+        generation = self._next_generation()
+        self._executor.submit(self._run, text, generation)
+
+    def cancel(self):
+        """Abandon any running search and start the next one from scratch."""
+        generation = self._next_generation()
+        self._delivered = generation
+        self._executor.submit(self.session.reset)
+
+    def terminate(self):
+        self._next_generation()
+        self._executor.shutdown(wait=False)
+
+    def _run(self, text, generation):
+        if self.is_stale(generation):
+            return
+        try:
+            commands = self.session.search(
+                text, cancelled=lambda: self.is_stale(generation)
+            )
+        except SearchCancelled:
+            return
+        except:
+            log.exception(f"Failed to search for commands matching '{text}'")
+            return
+        wx.CallAfter(self._deliver, text, commands, generation)
+
+    def _deliver(self, text, commands, generation):
+        if self.is_stale(generation):
+            return
+        self._delivered = generation
+        self.on_result(text, commands)
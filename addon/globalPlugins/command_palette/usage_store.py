@@ -0,0 +1,137 @@
+# coding: utf-8
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import suppress
+from logHandler import log
+
+
+USAGE_FILE_VERSION = 1
+
+
+class UsageStore:
+    """Records when commands are run, so that the most used come first.
+
+    Commands are identified by their (category, label, command_info)
+    identity. For every command run, the store keeps the number of runs,
+    the time of the last run and a frecency score: every run adds 1 to
+    the score, which then halves every `half_life` seconds. Commands run
+    often and recently have the highest frecency.
+
+    The records are saved as compact JSON. The file is written under a
+    temporary name then renamed, so it is never left half written. Only
+    the `max_entries` commands with the highest frecency are kept.
+    `save_later` saves them on a background thread, once runs stop
+    being recorded for a while.
+    """
+
+    def __init__(self, path, half_life, max_entries=None):
+        self.path = path
+        self.half_life = half_life
+        self.max_entries = max_entries
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._save_timer = None
+
+    def decay(self, score, last_used, now):
+        return score * 0.5 ** ((now - last_used) / self.half_life)
+
+    def load(self):
+        if not self.path or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            rows = data["commands"]
+        except:
+            log.exception(f"Failed to load the command usage from: '{self.path}'")
+            return
+        entries = {}
+        skipped = 0
+        for row in rows:
+            try:
+                entries[tuple(row[:3])] = (int(row[3]), float(row[4]), float(row[5]))
+            except (TypeError, ValueError, IndexError):
+                skipped += 1
+        if skipped:
+            log.warning(f"Skipped {skipped} invalid records in: '{self.path}'")
+        with self._lock:
+            entries.update(self.entries)
+            self.entries = entries
+
+    def record(self, identity, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            count, last_used, score = self.entries.get(identity, (0, now, 0.0))
+            self.entries[identity] = (
+                count + 1,
+                now,
+                self.decay(score, last_used, now) + 1,
+            )
+
+    def frecencies(self, now=None):
+        """Return a dictionary of command identities to their frecency."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._frecencies(now)
+
+    def _frecencies(self, now):
+        return {
+            identity: self.decay(score, last_used, now)
+            for (identity, (count, last_used, score)) in self.entries.items()
+        }
+
+    def save_later(self, delay):
+        """Save the records in delay seconds, unless this is called again before."""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(delay, self._save_in_background)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Save the records now if saving them is pending."""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+            self.save()
+
+    def _save_in_background(self):
+        try:
+            self.save()
+        except:
+            log.exception(f"Failed to save the command usage to: '{self.path}'")
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            frecencies = self._frecencies(time.time())
+            identities = sorted(self.entries, key=frecencies.get, reverse=True)
+            if self.max_entries is not None:
+                for identity in identities[self.max_entries :]:
+                    del self.entries[identity]
+                identities = identities[: self.max_entries]
+            rows = []
+            for identity in identities:
+                count, last_used, score = self.entries[identity]
+                rows.append([*identity, count, round(last_used), round(score, 4)])
+        data = {"version": USAGE_FILE_VERSION, "commands": rows}
+        fd, temp_path = tempfile.mkstemp(
+            prefix=".command_palette_usage", dir=os.path.dirname(self.path)
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(data, file, ensure_ascii=False, separators=(",", ":"))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+        except:
+            with suppress(OSError):
+                os.remove(temp_path)
+            raise
@@ -0,0 +1,108 @@
+# coding: utf-8
+"""Synthetic command labels and keystroke sequences.
+
+The labels follow the "Category: label" style of the NVDA input
+gestures. The keystroke sequences mimic someone typing the start of one
+or two words of the command they are looking for, with the occasional
+typo, backspace or query that matches nothing.
+"""
+
+import random
+
+
+CATEGORIES = (
+    "Braille",
+    "Browse mode",
+    "Configuration",
+    "Configuration profiles",
+    "Document formatting",
+    "Input",
+    "Mouse",
+    "Object navigation",
+    "Speech",
+    "System caret",
+    "System focus",
+    "System status",
+    "Text review",
+    "Tools",
+    "Touch screen",
+    "Vision",
+    "Web search",
+    "Windows",
+)
+WORDS = (
+    "activate announce application article audio automatic battery beep "
+    "block braille browse button capital caret category cell character "
+    "clipboard close column combo console copy current cursor date delete "
+    "describe dialog display document ducking edit element end exit "
+    "field figure first focus font foreground form formatting frame "
+    "gesture graphic grouping heading help highlight indentation input "
+    "item key landmark language last layout level line link list log "
+    "magnifier mark menu mode mouse move navigator next notepad object "
+    "open page paragraph paste pitch position previous profile progress "
+    "punctuation python quick radio rate read region report review row "
+    "say screen scroll search select selection separator settings "
+    "shape sleep speak speech spelling status symbol synth system table "
+    "tab text time title toggle touch translate tree type update "
+    "verbosity viewer virtual vision voice volume window word wrap zoom "
+    "café résumé naïve über élan façade"
+).split()
+# Queries that should not match anything
+MISSES = ("qzx", "jjvv", "xkcdq", "zzqy")
+
+
+def make_labels(size, seed=0):
+    """Return `size` distinct "Category: label" strings."""
+    rand = random.Random(seed)
+    labels = set()
+    while len(labels) < size:
+        words = rand.sample(WORDS, rand.randint(2, 6))
+        labels.add(f"{rand.choice(CATEGORIES)}: {' '.join(words)}")
+    return sorted(labels)
+
+
+def _typo(word, rand):
+    if len(word) < 3:
+        return word
+    pos = rand.randrange(len(word) - 1)
+    return word[:pos] + word[pos + 1] + word[pos] + word[pos + 2 :]
+
+
+def make_query(label, rand):
+    """Return what someone might type to find label."""
+    if rand.random() < 0.05:
+        return rand.choice(MISSES)
+    category, text = label.split(": ", 1)
+    words = text.split()
+    if rand.random() < 0.2:
+        words.insert(0, category.split()[0])
+    count = min(len(words), rand.choice((1, 2, 2, 3)))
+    start = rand.randrange(len(words) - count + 1)
+    parts = []
+    for word in words[start : start + count]:
+        word = word[: rand.randint(3, max(3, len(word)))]
+        if rand.random() < 0.1:
+            word = _typo(word, rand)
+        parts.append(word.lower() if rand.random() < 0.9 else word.upper())
+    return " ".join(parts)
+
+
+def keystrokes(query, rand):
+    """Return the successive contents of the search box while typing query."""
+    texts = []
+    typed = ""
+    for char in query:
+        if char.isalpha() and rand.random() < 0.03:
+            # A wrong key, noticed and erased
+            texts.append(typed + rand.choice("asdfjkl"))
+        typed += char
+        texts.append(typed)
+    return texts
+
+
+def make_sessions(labels, count, seed=0):
+    """Return `count` lists of keystrokes, each looking for a random label."""
+    rand = random.Random(seed)
+    return [
+        keystrokes(make_query(rand.choice(labels), rand), rand) for _ in range(count)
+    ]
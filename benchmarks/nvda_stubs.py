@@ -0,0 +1,112 @@
+# coding: utf-8
+"""Stand-ins for the NVDA modules imported by the command store.
+
+They make it possible to import the command store and the vendored
+libraries outside of NVDA, on any platform. Only what is used while
+loading and searching the commands is provided.
+"""
+
+import builtins
+import json
+import logging
+import os
+import sys
+import types
+
+
+ADDON_PACKAGE_NAME = "command_palette"
+ADDON_PACKAGE_DIR = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__), "..", "addon", "globalPlugins", ADDON_PACKAGE_NAME
+    )
+)
+LIBS_DIR = os.path.join(ADDON_PACKAGE_DIR, "libs")
+STUB_MODULES = (
+    "api",
+    "baseObject",
+    "globalCommands",
+    "keyboardHandler",
+    "queueHandler",
+    "scriptHandler",
+    "shellapi",
+    "tones",
+    "ui",
+    "vision",
+)
+
+
+class ScriptInfo:
+    """Stands for inputCore.AllGesturesScriptInfo."""
+
+    def __init__(self, className, scriptName):
+        self.className = className
+        self.scriptName = scriptName
+        self.moduleName = "globalCommands"
+        self.gestures = []
+
+
+class GestureMap:
+    def __init__(self):
+        self._map = {}
+
+
+class GestureManager:
+    """Stands for inputCore.manager.
+
+    `mappings` is returned as is by getAllGestureMappings, it maps
+    category names to dictionaries of script labels to ScriptInfo.
+    """
+
+    def __init__(self):
+        self.mappings = {}
+        self.localeGestureMap = GestureMap()
+        self.userGestureMap = GestureMap()
+
+    def getAllGestureMappings(self, obj=None, ancestors=None):
+        return self.mappings
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def install():
+    """Register the stand-in modules and return the gesture manager."""
+    if "inputCore" in sys.modules:
+        return sys.modules["inputCore"].manager
+    builtins.__dict__.setdefault("_", lambda text: text)
+    _module("logHandler", log=logging.getLogger("command_palette"))
+    _module("config", conf={}, getScratchpadDir=lambda: os.getcwd())
+    _module("globalVars", appArgs=types.SimpleNamespace(configPath=os.getcwd()))
+    manager = GestureManager()
+    _module("inputCore", manager=manager)
+    _module("globalPluginHandler", runningPlugins=set())
+    _module(
+        "gui", mainFrame=types.SimpleNamespace(prevFocus=None, prevFocusAncestors=[])
+    )
+    for name in STUB_MODULES:
+        _module(name)
+    # The vendored ujson is only built for NVDA's interpreter
+    sys.path.insert(0, LIBS_DIR)
+    try:
+        import ujson
+    except ImportError:
+        _module("ujson", load=json.load, loads=json.loads, dumps=json.dumps)
+    # Import the add-on modules without running the global plugin
+    package = types.ModuleType(ADDON_PACKAGE_NAME)
+    package.__path__ = [ADDON_PACKAGE_DIR]
+    sys.modules[ADDON_PACKAGE_NAME] = package
+    return manager
+
+
+def set_gesture_labels(labels):
+    """Make the NVDA gestures the given "Category: label" strings."""
+    manager = install()
+    manager.mappings = mappings = {}
+    for text in labels:
+        category, label = text.split(": ", 1)
+        script_name = "_".join(label.split())
+        mappings.setdefault(category, {})[label] = ScriptInfo(category, script_name)
@@ -0,0 +1,276 @@
+# coding: utf-8
+"""Benchmark the fuzzy scorers and the command store search.
+
+Run from the root of the repository, with any Python 3.7+ interpreter:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 --budget 2
+    python benchmarks/run_benchmarks.py --output new.json --baseline old.json
+
+NVDA is not needed, its modules are replaced by the stand-ins from
+nvda_stubs. For every corpus size, backend and case, keystroke sequences
+are replayed and the latency of every keystroke is measured. The report
+gives the p50, p95 and p99 latencies in milliseconds, the keystrokes
+handled per second, and the peak memory allocated while replaying one
+sequence. With --baseline, the p95 latencies are compared with those
+saved by a previous run with --output, and the exit status is 1 if any
+of them regressed by more than --tolerance.
+"""
+
+import argparse
+import difflib
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+
+import corpus
+import nvda_stubs
+
+
+nvda_stubs.install()
+
+from command_palette import command_store
+from fuzzywuzzy import batch, fuzz, process
+from fuzzywuzzy.StringMatcher import StringMatcher
+import Levenshtein
+
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+SCORERS = (
+    "ratio",
+    "partial_ratio",
+    "sliding_partial_ratio",
+    "token_sort_ratio",
+    "token_set_ratio",
+    "QRatio",
+    "WRatio",
+)
+# The sequence matcher used by the scorers, and whether to use the batch engine
+BACKENDS = {
+    "levenshtein": (StringMatcher, False),
+    "difflib": (difflib.SequenceMatcher, False),
+}
+if batch.available:
+    BACKENDS["numpy"] = (StringMatcher, True)
+
+
+def percentile(sorted_values, percent):
+    """Return the nearest-rank percentile of a sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[int(rank)]
+
+
+def make_store(labels):
+    nvda_stubs.set_gesture_labels(labels)
+    store = command_store.CommandStore()
+    store.load_gesture_commands()
+    return store
+
+
+def extract_bests_case(choices, scorer):
+    def search(text):
+        return process.extractBests(
+            text,
+            choices,
+            scorer=scorer,
+            score_cutoff=command_store.SCORE_CUTOFF,
+            limit=command_store.MAX_RESULTS,
+        )
+
+    return lambda: search
+
+
+def store_case(store, make_handler):
+    """Return a factory of the handlers of make_handler, emptying the query
+    cache of the store first so that searches are timed, not cache hits."""
+
+    def factory():
+        store.query_cache.clear()
+        return make_handler()
+
+    return factory
+
+
+def make_cases(store, scorers):
+    """Return a mapping of case names to factories of keystroke handlers.
+
+    A keystroke handler takes the text of the search box. Handlers that
+    keep state across keystrokes are created anew for every sequence, as
+    is the query cache of the store emptied.
+    """
+    cases = {}
+    for name in scorers:
+        cases[f"extractBests/{name}"] = extract_bests_case(
+            store.search_choices, getattr(fuzz, name)
+        )
+    cases["CommandStore.filter_by"] = store_case(store, lambda: store.filter_by)
+    cases["SearchSession.search"] = store_case(
+        store, lambda: store.create_search_session().search
+    )
+    return cases
+
+
+def replay(factory, sessions, budget):
+    """Replay the keystroke sessions and return the latencies in seconds.
+
+    Stops after the first keystroke that exceeds the time budget.
+    """
+    latencies = []
+    deadline = time.perf_counter() + budget
+    for keystrokes in sessions:
+        handle = factory()
+        for text in keystrokes:
+            start = time.perf_counter()
+            handle(text)
+            end = time.perf_counter()
+            latencies.append(end - start)
+            if end > deadline:
+                return latencies
+    return latencies
+
+
+def peak_memory(factory, keystrokes, budget):
+    """Return the peak memory, in bytes, allocated while replaying keystrokes."""
+    handle = factory()
+    deadline = time.perf_counter() + budget
+    tracemalloc.start()
+    try:
+        for text in keystrokes:
+            handle(text)
+            if time.perf_counter() > deadline:
+                break
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(args):
+    results = []
+    for size in args.sizes:
+        labels = corpus.make_labels(size, seed=args.seed)
+        sessions = corpus.make_sessions(labels, args.sessions, seed=args.seed)
+        tracemalloc.start()
+        started = time.perf_counter()
+        store = make_store(labels)
+        build_time = time.perf_counter() - started
+        build_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(
+            f"\n{size} labels, {len(store.get_commands())} commands: "
+            f"built in {build_time * 1000:.0f} ms, "
+            f"peak {build_memory / 1024:.0f} KiB"
+        )
+        print(
+            f"{'case':<38} {'backend':<12} {'keys':>5} {'p50':>9} {'p95':>9} "
+            f"{'p99':>9} {'keys/s':>9} {'peak KiB':>9}"
+        )
+        cases = make_cases(store, args.scorers)
+        for backend in args.backends:
+            fuzz.SequenceMatcher, batch.available = BACKENDS[backend]
+            for name, factory in cases.items():
+                latencies = sorted(replay(factory, sessions, args.budget))
+                memory = peak_memory(factory, sessions[0], args.budget)
+                total = sum(latencies)
+                result = {
+                    "size": size,
+                    "backend": backend,
+                    "case": name,
+                    "keystrokes": len(latencies),
+                    "p50": percentile(latencies, 50) * 1000,
+                    "p95": percentile(latencies, 95) * 1000,
+                    "p99": percentile(latencies, 99) * 1000,
+                    "throughput": len(latencies) / total if total else 0.0,
+                    "peak_memory": memory,
+                }
+                results.append(result)
+                print(
+                    f"{name:<38} {backend:<12} {result['keystrokes']:>5} "
+                    f"{result['p50']:>9.2f} {result['p95']:>9.2f} "
+                    f"{result['p99']:>9.2f} {result['throughput']:>9.1f} "
+                    f"{memory / 1024:>9.0f}"
+                )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print the cases whose p95 latency regressed, return their number."""
+    previous = {(r["size"], r["backend"], r["case"]): r for r in baseline["results"]}
+    regressions = 0
+    for result in results:
+        old = previous.get((result["size"], result["backend"], result["case"]))
+        if old is None or not old["p95"]:
+            continue
+        change = result["p95"] / old["p95"] - 1
+        if change > tolerance:
+            regressions += 1
+            print(
+                f"Regression: {result['case']} ({result['backend']}, "
+                f"{result['size']} labels): p95 {old['p95']:.2f} ms -> "
+                f"{result['p95']:.2f} ms ({change:+.0%})"
+            )
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--scorers", nargs="+", choices=SCORERS, default=SCORERS)
+    parser.add_argument(
+        "--backends", nargs="+", choices=tuple(BACKENDS), default=tuple(BACKENDS)
+    )
+    parser.add_argument(
+        "--sessions", type=int, default=30, help="Keystroke sequences per case"
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=5.0,
+        help="Seconds after which a case stops replaying keystrokes",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Save the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with the results in this file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed relative increase of the p95 latency",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    # Leave out the commands and the usage of the user running the benchmarks
+    command_store.USER_COMMANDS_JSON = ""
+    command_store.USAGE_JSON = ""
+    command_store.SNAPSHOT_FILE = ""
+    print(
+        f"Python {platform.python_version()} ({platform.python_implementation()}), "
+        f"Levenshtein: {Levenshtein._levenshtein.__name__}, "
+        f"NumPy: {batch.numpy.__version__ if batch.available else 'not available'}"
+    )
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {"python": platform.python_version(), "results": results},
+                file,
+                indent=2,
+            )
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
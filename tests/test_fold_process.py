@@ -0,0 +1,42 @@
+# coding: utf-8
+import os
+import sys
+import unicodedata
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__),
+        os.pardir,
+        "addon",
+        "globalPlugins",
+        "command_palette",
+        "libs",
+    ),
+)
+
+from fuzzywuzzy.utils import fold_process
+
+
+def test_latin_accents_are_removed():
+    assert fold_process("Préférences: Paramètres") == "preferences  parametres"
+
+
+def test_greek_and_cyrillic_accents_are_removed():
+    assert fold_process("Ρυθμίσεις") == "ρυθμισεισ"
+    assert fold_process("Ёлка") == "елка"
+
+
+def test_kana_voicing_marks_are_kept():
+    assert fold_process("バ") != fold_process("ハ")
+    assert fold_process("バックアップ") != fold_process("ハックアップ")
+    assert fold_process(unicodedata.normalize("NFD", "バックアップ")) == fold_process(
+        "バックアップ"
+    )
+    assert "゙" in fold_process("バ")
+
+
+def test_devanagari_marks_are_kept():
+    folded = fold_process("सेटिंग्स")
+    assert "्" in folded
+    assert folded != fold_process("सेटिंगस")
@@ -0,0 +1,91 @@
+# coding: utf-8
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__),
+        os.pardir,
+        "addon",
+        "globalPlugins",
+        "command_palette",
+    ),
+)
+
+from json_records import JSONRecordReader
+
+
+RECORDS = [
+    {"label": f"Command {i} é", "command_info": "x" * (i * 7), "args": {"a": ["}"]}}
+    for i in range(30)
+]
+
+
+def chunks(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def read(text, size=None, **kwargs):
+    reader = JSONRecordReader(chunks(text, size or len(text) or 1), **kwargs)
+    return list(reader), reader.errors
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 4096])
+def test_records_split_across_chunks(size):
+    text = json.dumps(RECORDS, indent=2)
+    records, errors = read(text, size)
+    assert [record for (line, record) in records] == RECORDS
+    assert errors == []
+    record_lines = [
+        number for (number, line) in enumerate(text.split("\n"), 1) if line == "  {"
+    ]
+    assert [line for (line, record) in records] == record_lines
+
+
+@pytest.mark.parametrize("size", [1, 5, 100])
+def test_json_lines(size):
+    text = "\n".join(json.dumps(record) for record in RECORDS) + "\n"
+    records, errors = read(text, size)
+    assert records == list(enumerate(RECORDS, 1))
+    assert errors == []
+
+
+@pytest.mark.parametrize("size", [3, 50, 10000])
+def test_bad_json_line_is_skipped(size):
+    lines = [json.dumps(record) for record in RECORDS]
+    lines[4] = lines[4][:-3]
+    lines[9] = "garbage"
+    records, errors = read("\n".join(lines), size)
+    assert [line for (line, record) in records] == [
+        line for line in range(1, 31) if line not in (5, 10)
+    ]
+    assert [line for (line, message) in errors] == [5, 10]
+
+
+@pytest.mark.parametrize("size", [3, 50, 10000])
+def test_bad_array_item_is_skipped(size):
+    text = json.dumps(RECORDS, indent=2)
+    text = text.replace('"label": "Command 3 \\u00e9"', '"label" "Command 3"')
+    records, errors = read(text, size)
+    assert [record for (line, record) in records] == RECORDS[:3] + RECORDS[4:]
+    assert len(errors) == 1
+    # The line starting the record
+    record_line = text.split("\n").index('    "label" "Command 3",')
+    assert errors[0][0] == record_line
+
+
+@pytest.mark.parametrize("text", ['[\n  {"a": 1},\n  {"b": ', '[\n  {"a": 1}\n'])
+def test_unterminated_array(text):
+    records, errors = read(text, 3)
+    assert records == [(2, {"a": 1})]
+    assert errors[-1][1] == "Unterminated array"
+
+
+def test_empty_text():
+    assert read("") == ([], [])
+    assert read(" \n", 1) == ([], [])
+    assert read("[]") == ([], [])
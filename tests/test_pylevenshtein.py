@@ -0,0 +1,157 @@
+# coding: utf-8
+import os
+import sys
+
+import pytest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__),
+        os.pardir,
+        "addon",
+        "globalPlugins",
+        "command_palette",
+        "libs",
+    ),
+)
+
+from Levenshtein import _pylevenshtein as lev
+
+
+LONG_A = "a" * 70 + "b"
+LONG_B = "b" + "a" * 70
+SENTENCE_A = "the quick brown fox jumps over the lazy dog and keeps running far away"
+SENTENCE_B = "a quick brown dog jumps over the lazy fox and then keeps running away"
+# The values returned by python-Levenshtein 0.12.2
+DISTANCES = [
+    ("", "", 0, 1.0),
+    ("", "abc", 3, 0.0),
+    ("abc", "", 3, 0.0),
+    ("kitten", "sitting", 3, 0.615385),
+    ("aaaa", "aa", 2, 0.666667),
+    ("abab", "baba", 2, 0.75),
+    ("aabbaa", "abba", 2, 0.8),
+    (LONG_A, LONG_B, 2, 0.985915),
+    (SENTENCE_A, SENTENCE_B, 16, 0.848921),
+    ("café", "cafe", 1, 0.75),
+    ("naïve résumé", "naive resume", 3, 0.75),
+    ("日本語入力", "日本入力", 1, 0.888889),
+]
+EDITOPS = [
+    ("", "", []),
+    ("", "abc", [("insert", 0, 0), ("insert", 0, 1), ("insert", 0, 2)]),
+    ("abc", "", [("delete", 0, 0), ("delete", 1, 0), ("delete", 2, 0)]),
+    ("kitten", "sitting", [("replace", 0, 0), ("replace", 4, 4), ("insert", 6, 6)]),
+    ("aaaa", "aa", [("delete", 2, 2), ("delete", 3, 2)]),
+    ("abab", "baba", [("delete", 0, 0), ("insert", 4, 3)]),
+    ("aabbaa", "abba", [("delete", 1, 1), ("delete", 4, 3)]),
+    (LONG_A, LONG_B, [("replace", 0, 0), ("replace", 70, 70)]),
+    (
+        SENTENCE_A,
+        SENTENCE_B,
+        [
+            ("delete", 0, 0),
+            ("delete", 1, 0),
+            ("replace", 2, 0),
+            ("replace", 16, 14),
+            ("replace", 18, 16),
+            ("replace", 40, 38),
+            ("replace", 42, 40),
+            ("insert", 47, 45),
+            ("insert", 47, 46),
+            ("insert", 47, 47),
+            ("insert", 47, 48),
+            ("insert", 47, 49),
+            ("delete", 61, 64),
+            ("delete", 62, 64),
+            ("delete", 63, 64),
+            ("delete", 64, 64),
+        ],
+    ),
+    (
+        "naïve résumé",
+        "naive resume",
+        [("replace", 2, 2), ("replace", 7, 7), ("replace", 11, 11)],
+    ),
+    ("日本語入力", "日本入力", [("delete", 2, 2)]),
+]
+OPCODES = [
+    ("", "", []),
+    ("", "abc", [("insert", 0, 0, 0, 3)]),
+    (
+        "kitten",
+        "sitting",
+        [
+            ("replace", 0, 1, 0, 1),
+            ("equal", 1, 4, 1, 4),
+            ("replace", 4, 5, 4, 5),
+            ("equal", 5, 6, 5, 6),
+            ("insert", 6, 6, 6, 7),
+        ],
+    ),
+    (
+        "abab",
+        "baba",
+        [("delete", 0, 1, 0, 0), ("equal", 1, 4, 0, 3), ("insert", 4, 4, 3, 4)],
+    ),
+    (
+        LONG_A,
+        LONG_B,
+        [("replace", 0, 1, 0, 1), ("equal", 1, 70, 1, 70), ("replace", 70, 71, 70, 71)],
+    ),
+    (
+        "日本語入力",
+        "日本入力",
+        [("equal", 0, 2, 0, 2), ("delete", 2, 3, 2, 2), ("equal", 3, 5, 2, 4)],
+    ),
+]
+MATCHING_BLOCKS = [
+    ("", "", [(0, 0, 0)]),
+    ("abc", "", [(3, 0, 0)]),
+    ("kitten", "sitting", [(1, 1, 3), (5, 5, 1), (6, 7, 0)]),
+    ("aabbaa", "abba", [(0, 0, 1), (2, 1, 2), (5, 3, 1), (6, 4, 0)]),
+    (LONG_A, LONG_B, [(1, 1, 69), (71, 71, 0)]),
+    (
+        SENTENCE_A,
+        SENTENCE_B,
+        [
+            (3, 1, 13),
+            (17, 15, 1),
+            (19, 17, 21),
+            (41, 39, 1),
+            (43, 41, 4),
+            (47, 50, 14),
+            (65, 64, 5),
+            (70, 69, 0),
+        ],
+    ),
+    ("naïve résumé", "naive resume", [(0, 0, 2), (3, 3, 4), (8, 8, 3), (12, 12, 0)]),
+]
+
+
+@pytest.mark.parametrize("s1, s2, distance, ratio", DISTANCES)
+def test_distance_and_ratio(s1, s2, distance, ratio):
+    assert lev.distance(s1, s2) == distance
+    assert lev.ratio(s1, s2) == pytest.approx(ratio, abs=1e-6)
+
+
+@pytest.mark.parametrize("s1, s2, editops", EDITOPS)
+def test_editops(s1, s2, editops):
+    assert lev.editops(s1, s2) == editops
+    assert lev.editops(lev.opcodes(s1, s2), s1, s2) == editops
+
+
+@pytest.mark.parametrize("s1, s2, opcodes", OPCODES)
+def test_opcodes(s1, s2, opcodes):
+    assert lev.opcodes(s1, s2) == opcodes
+    assert lev.opcodes(lev.editops(s1, s2), s1, s2) == opcodes
+
+
+@pytest.mark.parametrize("s1, s2, blocks", MATCHING_BLOCKS)
+def test_matching_blocks(s1, s2, blocks):
+    editops = lev.editops(s1, s2)
+    assert [tuple(b) for b in lev.matching_blocks(editops, s1, s2)] == blocks
+    assert [tuple(b) for b in lev.matching_blocks(editops, len(s1), len(s2))] == blocks
+    opcodes = lev.opcodes(s1, s2)
+    assert [tuple(b) for b in lev.matching_blocks(opcodes, s1, s2)] == blocks